@@ -0,0 +1,72 @@
+"""
+Compares two result files written by run.py or micro.py.
+
+    python benchmarks/compare.py results/base.json results/head.json --threshold 10
+
+Prints the change of every metric per endpoint and exits with status 1 when any
+endpoint regressed more than --threshold percent (higher latency/RSS or lower RPS).
+"""
+import argparse
+import json
+import sys
+
+# Métrica -> True si un valor mayor es mejor
+METRICS = {
+    "rps": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "peak_rss_mb": False,
+}
+
+
+def load(path):
+    with open(path) as source:
+        return json.load(source)
+
+
+def change(before, after):
+    if before in (None, 0) or after is None:
+        return None
+    return (after - before) / before * 100
+
+
+def compare(base, head, threshold):
+    rows, regressions = [], []
+    for backend, scenarios in sorted(head["results"].items()):
+        for scenario, after in sorted(scenarios.items()):
+            before = base["results"].get(backend, {}).get(scenario)
+            if before is None:
+                continue
+            for metric, higher_is_better in METRICS.items():
+                if metric not in after:
+                    continue
+                delta = change(before.get(metric), after.get(metric))
+                worse = delta is not None and (-delta if higher_is_better else delta) > threshold
+                rows.append((backend, scenario, metric, before.get(metric), after.get(metric), delta, worse))
+                if worse:
+                    regressions.append((backend, scenario, metric))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent")
+    options = parser.parse_args()
+
+    base, head = load(options.base), load(options.head)
+    print(f"base {base['meta'].get('revision')}  head {head['meta'].get('revision')}")
+    rows, regressions = compare(base, head, options.threshold)
+    for backend, scenario, metric, before, after, delta, worse in rows:
+        delta_text = f"{delta:+.1f}%" if delta is not None else "n/a"
+        print(f"{backend:10} {scenario:24} {metric:12} {before!s:>12} -> {after!s:>12} {delta_text:>9}"
+              + ("  REGRESSION" if worse else ""))
+    if regressions:
+        print(f"{len(regressions)} metrics regressed more than {options.threshold}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Closed-loop HTTP load generator: N threads, each with its own keep-alive connection,
+sending requests back to back for a fixed duration. Also samples the resident memory
+of the server process tree (Linux /proc) while the load runs.
+"""
+import http.client
+import math
+import os
+import random
+import threading
+import time
+from collections import Counter
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    # Nearest-rank: el menor valor que deja por debajo al menos esa fracción
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def process_tree(pid):
+    """pid and all its descendants (gunicorn/uvicorn master + workers)."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat:
+                parent = int(stat.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    pids, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        pids.append(current)
+        pending.extend(children.get(current, ()))
+    return pids
+
+
+def rss_bytes(pids):
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+    return total
+
+
+class RSSSampler(threading.Thread):
+    """Keeps the peak RSS (sum over the process tree) seen while running."""
+
+    def __init__(self, pid, interval=0.1):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        if not os.path.isdir("/proc"):
+            return
+        while not self._stop_event.is_set():
+            self.peak = max(self.peak, rss_bytes(process_tree(self.pid)))
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return self.peak or None
+
+
+def run_load(host, port, make_request, concurrency, duration, warmup=0.0, random_seed=0):
+    """make_request(rng) -> (method, path, body bytes or None).
+
+    Returns latencies (seconds, sorted), status counts, errors and elapsed time of the
+    measured period; requests issued during the warmup are discarded."""
+    started = time.perf_counter()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+    latencies, statuses, errors = [], Counter(), Counter()
+    lock = threading.Lock()
+
+    def worker(position):
+        rng = random.Random(random_seed * 1000 + position)
+        connection = http.client.HTTPConnection(host, port, timeout=30)
+        own_latencies, own_statuses, own_errors = [], Counter(), Counter()
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            method, path, body = make_request(rng)
+            headers = {"Content-Type": "application/json"} if body is not None else {}
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException) as error:
+                connection.close()
+                status = None
+                if now >= measure_from:
+                    own_errors[type(error).__name__] += 1
+            finished = time.perf_counter()
+            if now >= measure_from and status is not None:
+                own_latencies.append(finished - now)
+                own_statuses[status] += 1
+        connection.close()
+        with lock:
+            latencies.extend(own_latencies)
+            statuses.update(own_statuses)
+            errors.update(own_errors)
+
+    threads = [threading.Thread(target=worker, args=(position,)) for position in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return latencies, statuses, errors, duration
+
+
+def summarize(latencies, statuses, errors, elapsed, peak_rss=None):
+    requests = len(latencies)
+    milliseconds = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        "requests": requests,
+        "rps": round(requests / elapsed, 2) if elapsed else None,
+        "p50_ms": milliseconds(percentile(latencies, 0.50)),
+        "p95_ms": milliseconds(percentile(latencies, 0.95)),
+        "p99_ms": milliseconds(percentile(latencies, 0.99)),
+        "mean_ms": milliseconds(sum(latencies) / requests) if requests else None,
+        "max_ms": milliseconds(latencies[-1]) if latencies else None,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "errors": dict(errors),
+        "peak_rss_mb": round(peak_rss / 2 ** 20, 1) if peak_rss else None,
+    }
@@ -0,0 +1,119 @@
+"""
+In-process micro-benchmarks of the hot paths (no HTTP server, no network): queries,
+serialization, JSON encoding, cache hits and the search/autocomplete indexes.
+
+    python benchmarks/micro.py --rows 10000 --output results/micro.json
+
+The output has the same layout as run.py (results.micro.<case>) so compare.py can diff it.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from loadgen import summarize
+from run import git_revision
+import seed as seeder
+
+
+def measure(function, iterations, warmup):
+    for _ in range(warmup):
+        function()
+    timings = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    return summarize(timings, {}, {}, elapsed)
+
+
+def cases(rows):
+    from werkzeug.datastructures import MultiDict
+    from app import app, db, catalogue_cache, collection_data, item_data
+    from models import People
+    from serializers import SERIALIZERS
+    from autocomplete import autocomplete_index
+    import search
+
+    client = app.test_client()
+    serializer = SERIALIZERS[People]
+    page_args = MultiDict({"limit": "100"})
+    page = collection_data(db.session, People, page_args)
+    raw_rows = db.session.execute(serializer.select().limit(100)).all()
+
+    def uncached(function):
+        # Subir la versión de la tabla obliga a leer de la base de datos
+        def wrapper():
+            catalogue_cache.invalidate("people")
+            return function()
+        return wrapper
+
+    return {
+        "people_page_query": uncached(lambda: collection_data(db.session, People, page_args)),
+        "people_page_cached": lambda: collection_data(db.session, People, page_args),
+        "people_sorted_query": uncached(lambda: collection_data(db.session, People, MultiDict({"sort": "-height", "limit": "100"}))),
+        "people_item_query": uncached(lambda: item_data(db.session, People, rows // 2, MultiDict())),
+        "serialize_100_rows": lambda: serializer.to_dicts(raw_rows),
+        "json_encode_page": lambda: app.json.dumps_bytes(page),
+        "http_people_page": lambda: client.get("/people?limit=100"),
+        "http_people_item": lambda: client.get(f"/people/{rows // 2}"),
+        "http_user_favorites_expand": lambda: client.get("/users/1/favorites?expand=true"),
+        "search_query": lambda: search.search(db.session.connection(), "luke sky", [], 20, 0),
+        "autocomplete_lookup": lambda: autocomplete_index.lookup("sky", ["people", "planets", "vehicles"], 10),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=f"sqlite:///{os.path.join(tempfile.gettempdir(), 'benchmark-micro.db')}")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--case", action="append", help="Run only these cases (repeatable)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "micro.json"))
+    options = parser.parse_args()
+
+    os.environ.setdefault("RATELIMIT_ENABLED", "false")
+    if options.skip_seed:
+        os.environ["DATABASE_URL"] = options.database_url
+        sys.path.insert(0, seeder.SRC)
+    else:
+        seeder.seed(options.database_url, options.rows, random_seed=options.seed)
+
+    from app import app, db
+    from autocomplete import autocomplete_index
+
+    results = {}
+    with app.app_context():
+        available = cases(options.rows)
+        for entity_type in ("people", "planets", "vehicles"):
+            autocomplete_index.ensure_loaded(db.session, entity_type)
+        for name in options.case or available:
+            results[name] = measure(available[name], options.iterations, options.warmup)
+            print(f"  {name:28} {results[name]['rps']:>10} ops/s  p50 {results[name]['p50_ms']} ms")
+            db.session.remove()
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "rows": options.rows,
+            "iterations": options.iterations,
+        },
+        "results": {"micro": results},
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(options.output)), exist_ok=True)
+    with open(options.output, "w") as output:
+        json.dump(report, output, indent=2, sort_keys=True)
+    print(f"Results written to {options.output}")
+
+
+if __name__ == "__main__":
+    main()
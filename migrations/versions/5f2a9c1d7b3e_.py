@@ -0,0 +1,30 @@
+"""unique composite index on favorites (user_id, favorite_type, favorite_id)
+
+Revision ID: 5f2a9c1d7b3e
+Revises: 27c06e81ffd6
+Create Date: 2026-10-18 10:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f2a9c1d7b3e'
+down_revision = '27c06e81ffd6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Se eliminan los duplicados existentes (se conserva el más antiguo) antes de crear el índice único
+    op.execute(
+        "DELETE FROM favorites WHERE id NOT IN ("
+        "SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM favorites "
+        "GROUP BY user_id, favorite_type, favorite_id) AS keep)"
+    )
+    op.create_index('ix_favorites_user_type_favorite', 'favorites', ['user_id', 'favorite_type', 'favorite_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_favorites_user_type_favorite', table_name='favorites')
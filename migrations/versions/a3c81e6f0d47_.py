@@ -0,0 +1,76 @@
+"""numeric shadow columns and filter/sort indexes on people, planets and vehicles
+
+Revision ID: a3c81e6f0d47
+Revises: 5f2a9c1d7b3e
+Create Date: 2026-10-18 11:02:17.530921
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c81e6f0d47'
+down_revision = '5f2a9c1d7b3e'
+branch_labels = None
+depends_on = None
+
+# tabla -> {columna de texto: columna numérica}
+NUMERIC_COLUMNS = {
+    'people': {'height': 'height_num', 'mass': 'mass_num'},
+    'planets': {'diameter': 'diameter_num', 'population': 'population_num', 'orbital_period': 'orbital_period_num'},
+    'vehicles': {'cost_in_credits': 'cost_in_credits_num', 'crew': 'crew_num', 'length': 'length_num'},
+}
+
+FILTER_COLUMNS = {
+    'people': ['gender'],
+    'planets': ['climate', 'terrain'],
+    'vehicles': ['vehicle_class', 'manufacturer'],
+}
+
+UNKNOWN_VALUES = {'', 'unknown', 'n/a', 'none', 'indefinite'}
+
+
+# Copia de models.parse_number: las migraciones no deben depender del código de la app
+def parse_number(value):
+    if value is None:
+        return None
+    text = str(value).strip().lower().replace(',', '')
+    if text in UNKNOWN_VALUES:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def upgrade():
+    bind = op.get_bind()
+    for table, columns in NUMERIC_COLUMNS.items():
+        for numeric in columns.values():
+            op.add_column(table, sa.Column(numeric, sa.Float(), nullable=True))
+
+        # Relleno de las columnas nuevas a partir de los textos existentes
+        source = sa.table(table, sa.column('id'), *(sa.column(name) for name in columns))
+        target = sa.table(table, sa.column('id'), *(sa.column(name) for name in columns.values()))
+        rows = bind.execute(sa.select(source)).mappings().all()
+        for row in rows:
+            values = {numeric: parse_number(row[text]) for text, numeric in columns.items()}
+            bind.execute(target.update().where(target.c.id == row['id']).values(**values))
+
+        for numeric in columns.values():
+            op.create_index(f'ix_{table}_{numeric}', table, [numeric, 'id'], unique=False)
+    for table, columns in FILTER_COLUMNS.items():
+        for column in columns:
+            op.create_index(f'ix_{table}_{column}', table, [column, 'id'], unique=False)
+
+
+def downgrade():
+    for table, columns in FILTER_COLUMNS.items():
+        for column in columns:
+            op.drop_index(f'ix_{table}_{column}', table_name=table)
+    for table, columns in NUMERIC_COLUMNS.items():
+        for numeric in columns.values():
+            op.drop_index(f'ix_{table}_{numeric}', table_name=table)
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.drop_column(numeric)
@@ -0,0 +1,42 @@
+"""favorite_count counter and index on people, planets and vehicles
+
+Revision ID: a4c8e2f61b37
+Revises: e3b7a5d29c14
+Create Date: 2026-10-18 17:20:41.118302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c8e2f61b37'
+down_revision = 'e3b7a5d29c14'
+branch_labels = None
+depends_on = None
+
+# Tabla de cada código de favorite_type (copia fija de register_favorite_type en models.py)
+TABLE_CODES = {"people": 1, "planets": 2, "vehicles": 3}
+
+
+def upgrade():
+    # Índice temporal para que el recuento inicial sea una búsqueda por fila y no un
+    # recorrido de favorites por cada fila del catálogo
+    op.create_index('ix_favorites_type_favorite_tmp', 'favorites', ['favorite_type', 'favorite_id'], unique=False)
+    for table, code in TABLE_CODES.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('favorite_count', sa.Integer(), nullable=False, server_default='0'))
+        # Los contadores parten de los favoritos ya existentes
+        op.execute(
+            f"UPDATE {table} SET favorite_count = (SELECT COUNT(*) FROM favorites "
+            f"WHERE favorites.favorite_type = {code} AND favorites.favorite_id = {table}.id)"
+        )
+        op.create_index(f'ix_{table}_favorite_count', table, ['favorite_count', 'id'], unique=False)
+    op.drop_index('ix_favorites_type_favorite_tmp', table_name='favorites')
+
+
+def downgrade():
+    for table in TABLE_CODES:
+        op.drop_index(f'ix_{table}_favorite_count', table_name=table)
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('favorite_count')
@@ -0,0 +1,71 @@
+"""full-text search index over people, planets and vehicles
+
+Revision ID: c7d2f4a9e815
+Revises: a3c81e6f0d47
+Create Date: 2026-10-18 11:48:55.204377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d2f4a9e815'
+down_revision = 'a3c81e6f0d47'
+branch_labels = None
+depends_on = None
+
+# Documentos del índice: tabla -> columnas que forman el texto secundario (body)
+DOCUMENTS = {
+    'people': [],
+    'planets': ['terrain', 'climate'],
+    'vehicles': ['model', 'manufacturer'],
+}
+
+
+def body_expression(dialect, columns):
+    if not columns:
+        return "''"
+    if dialect in ('mysql', 'mariadb'):
+        return "CONCAT_WS(' ', {})".format(", ".join(columns))
+    return " || ' ' || ".join(columns)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE catalogue_search USING fts5("
+            "entity_type UNINDEXED, entity_id UNINDEXED, name, body, "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+    elif dialect == 'postgresql':
+        op.execute(
+            "CREATE TABLE catalogue_search ("
+            "entity_type VARCHAR(20) NOT NULL, entity_id INTEGER NOT NULL, "
+            "name TEXT NOT NULL, body TEXT NOT NULL, "
+            "document tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple', name), 'A') || setweight(to_tsvector('simple', body), 'B')) STORED, "
+            "PRIMARY KEY (entity_type, entity_id))"
+        )
+        op.execute("CREATE INDEX ix_catalogue_search_document ON catalogue_search USING GIN (document)")
+    else:
+        op.create_table('catalogue_search',
+        sa.Column('entity_type', sa.String(length=20), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('body', sa.String(length=255), nullable=False),
+        sa.PrimaryKeyConstraint('entity_type', 'entity_id')
+        )
+
+    for table, columns in DOCUMENTS.items():
+        op.execute(
+            f"INSERT INTO catalogue_search (entity_type, entity_id, name, body) "
+            f"SELECT '{table}', id, name, {body_expression(dialect, columns)} FROM {table}"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_catalogue_search_document")
+    op.execute("DROP TABLE catalogue_search")
@@ -0,0 +1,65 @@
+"""favorites.favorite_type as a SMALLINT code instead of a string
+
+Revision ID: e3b7a5d29c14
+Revises: c7d2f4a9e815
+Create Date: 2026-10-18 16:05:12.550917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b7a5d29c14'
+down_revision = 'c7d2f4a9e815'
+branch_labels = None
+depends_on = None
+
+# Copia fija de register_favorite_type en models.py (las migraciones no importan los modelos)
+TYPE_CODES = {"people": 1, "planet": 2, "vehicle": 3}
+TYPE_ALIASES = {"people": 1, "planet": 2, "planets": 2, "vehicle": 3, "vehicles": 3}
+
+
+def upgrade():
+    # Los favoritos de tipos desconocidos no se pueden convertir y no se borran: la migración
+    # se detiene antes de tocar la tabla para que se corrijan o se añadan a TYPE_ALIASES
+    favorites = sa.table('favorites', sa.column('favorite_type', sa.String))
+    unmapped = op.get_bind().execute(
+        sa.select(favorites.c.favorite_type, sa.func.count())
+        .where(sa.func.lower(favorites.c.favorite_type).not_in(list(TYPE_ALIASES)))
+        .group_by(favorites.c.favorite_type)
+    ).all()
+    if unmapped:
+        found = ", ".join(f"{favorite_type!r} ({count} rows)" for favorite_type, count in unmapped)
+        raise RuntimeError(f"favorites has types without a code: {found}. Fix those rows or map them in TYPE_ALIASES")
+
+    op.add_column('favorites', sa.Column('favorite_type_code', sa.SmallInteger(), nullable=True))
+    cases = " ".join(f"WHEN '{name}' THEN {code}" for name, code in TYPE_ALIASES.items())
+    op.execute(f"UPDATE favorites SET favorite_type_code = CASE LOWER(favorite_type) {cases} END")
+    # "planet" y "planets" pasan a ser el mismo tipo, así que puede haber duplicados
+    # (se conserva el más antiguo)
+    op.execute(
+        "DELETE FROM favorites WHERE id NOT IN ("
+        "SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM favorites "
+        "GROUP BY user_id, favorite_type_code, favorite_id) AS keep)"
+    )
+
+    op.drop_index('ix_favorites_user_type_favorite', table_name='favorites')
+    with op.batch_alter_table('favorites', schema=None) as batch_op:
+        batch_op.drop_column('favorite_type')
+        batch_op.alter_column('favorite_type_code', new_column_name='favorite_type',
+                              existing_type=sa.SmallInteger(), nullable=False)
+    op.create_index('ix_favorites_user_type_favorite', 'favorites', ['user_id', 'favorite_type', 'favorite_id'], unique=True)
+
+
+def downgrade():
+    op.add_column('favorites', sa.Column('favorite_type_name', sa.String(length=50), nullable=True))
+    cases = " ".join(f"WHEN {code} THEN '{name}'" for name, code in TYPE_CODES.items())
+    op.execute(f"UPDATE favorites SET favorite_type_name = CASE favorite_type {cases} END")
+
+    op.drop_index('ix_favorites_user_type_favorite', table_name='favorites')
+    with op.batch_alter_table('favorites', schema=None) as batch_op:
+        batch_op.drop_column('favorite_type')
+        batch_op.alter_column('favorite_type_name', new_column_name='favorite_type',
+                              existing_type=sa.String(length=50), nullable=False)
+    op.create_index('ix_favorites_user_type_favorite', 'favorites', ['user_id', 'favorite_type', 'favorite_id'], unique=True)
@@ -1,7 +1,17 @@
 import os
 from flask_admin import Admin
-from models import db, Users, People, Planets, Vehicles, Favorites
+from models import db, Users, People, Planets, Vehicles, Favorites, FAVORITE_TYPE_CODES
 from flask_admin.contrib.sqla import ModelView
+from wtforms import SelectField
+
+class FavoritesView(ModelView):
+    # favorite_type se guarda como código numérico: en el formulario se elige por nombre
+    form_overrides = {"favorite_type": SelectField}
+    form_args = {"favorite_type": {"choices": [(name, name) for name in FAVORITE_TYPE_CODES]}}
+
+class CatalogueView(ModelView):
+    # favorite_count lo mantienen los favoritos: se muestra pero no se edita a mano
+    form_excluded_columns = ("favorite_count",)
 
 def setup_admin(app):
     app.secret_key = os.environ.get('FLASK_APP_KEY', 'sample key')
@@ -11,10 +21,10 @@ def setup_admin(app):
     
     # Add your models here, for example this is how we add a the User model to the admin
     admin.add_view(ModelView(Users, db.session))
-    admin.add_view(ModelView(People, db.session))
-    admin.add_view(ModelView(Planets, db.session))
-    admin.add_view(ModelView(Vehicles, db.session))
-    admin.add_view(ModelView(Favorites, db.session))
+    admin.add_view(CatalogueView(People, db.session))
+    admin.add_view(CatalogueView(Planets, db.session))
+    admin.add_view(CatalogueView(Vehicles, db.session))
+    admin.add_view(FavoritesView(Favorites, db.session))
 
     # You can duplicate that line to add mew models
     # admin.add_view(ModelView(YourModelName, db.session))
\ No newline at end of file
@@ -2,30 +2,147 @@
 This module takes care of starting the API Server, Loading the DB and Adding the endpoints
 """
 import os
-from flask import Flask, request, jsonify, url_for
+from flask import Flask, Response, request, jsonify, url_for, stream_with_context
 from flask_migrate import Migrate
 from flask_swagger import swagger
 from flask_cors import CORS
-from utils import APIException, generate_sitemap
+from sqlalchemy import select, delete, and_, or_, literal, Integer
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.routing import BaseConverter
+from utils import APIException, generate_sitemap, paginate, parse_limit, is_truthy, stream_json_array, stream_ndjson
 from admin import setup_admin
-from models import db, Users, People, Planets, Vehicles, Favorites
+from models import db, on_change, mark_changed, insert_ignore_duplicates, adjust_favorite_counts, recount_favorites, Users, People, Planets, Vehicles, Favorites, FavoriteType, FAVORITE_MODELS, FAVORITE_TYPE_NAMES
+from cache import CatalogueCache, create_backend
+from conditional import conditional
+from serializers import SERIALIZERS, FastJSONProvider
+import search
+from autocomplete import autocomplete_index, AUTOCOMPLETE_MODELS
+from database import engine_options_from_env, instrument_engine, pool_stats, ReplicaRouter
+import metrics
+import compression
+import ratelimit
+from seeder import register_seed_command
 #from models import Person
 
 app = Flask(__name__)
 app.url_map.strict_slashes = False
 
+
+# <favorite_type:...> en las rutas: acepta los tipos registrados (y sus alias) y
+# entrega al handler el nombre canónico ("planets" -> "planet")
+class FavoriteTypeConverter(BaseConverter):
+    def __init__(self, url_map):
+        super().__init__(url_map)
+        self.regex = "|".join(sorted(FAVORITE_MODELS, key=len, reverse=True))
+
+    def to_python(self, value):
+        return FAVORITE_TYPE_NAMES[FAVORITE_MODELS[value]]
+
+
+app.url_map.converters['favorite_type'] = FavoriteTypeConverter
+# Codificador JSON rápido (orjson) si está instalado
+app.json = FastJSONProvider(app)
+
 db_url = os.getenv("DATABASE_URL")
 if db_url is not None:
     app.config['SQLALCHEMY_DATABASE_URI'] = db_url.replace("postgres://", "postgresql://")
 else:
     app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite:////tmp/test.db"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Pool de conexiones: DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+# DB_POOL_PRE_PING y DB_STATEMENT_TIMEOUT_MS (ver src/database.py)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options_from_env(app.config['SQLALCHEMY_DATABASE_URI'])
 
-MIGRATE = Migrate(app, db)
+MIGRATE = Migrate(app, db, include_object=search.include_object)
 db.init_app(app)
+with app.app_context():
+    instrument_engine(db.engine)
 CORS(app)
 setup_admin(app)
 
+# Latencia, sentencias SQL y tiempo en base de datos por endpoint: /metrics y cabecera
+# Server-Timing. Las peticiones con más de METRICS_QUERY_THRESHOLD sentencias se avisan en el log.
+app.config['METRICS_QUERY_THRESHOLD'] = int(os.getenv("METRICS_QUERY_THRESHOLD", 20))
+metrics.init_app(app)
+
+# Compresión negociada (zstd/br/gzip) de las respuestas mayores que COMPRESS_MIN_SIZE.
+# Se registra después de las métricas para que estas midan el tamaño ya comprimido.
+app.config['COMPRESS_MIN_SIZE'] = int(os.getenv("COMPRESS_MIN_SIZE", 1024))
+if os.getenv("COMPRESS_ALGORITHMS") is not None:
+    app.config['COMPRESS_ALGORITHMS'] = os.getenv("COMPRESS_ALGORITHMS")
+compression.init_app(app)
+
+# Detrás de un proxy (Render, Heroku) remote_addr es la IP del proxy. TRUSTED_PROXY_HOPS=n toma
+# la del cliente de X-Forwarded-For contando n proxies desde la derecha; las entradas de más
+# a la izquierda las escribe el propio cliente y no son de fiar.
+app.config['TRUSTED_PROXY_HOPS'] = int(os.getenv("TRUSTED_PROXY_HOPS", 0))
+if app.config['TRUSTED_PROXY_HOPS']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXY_HOPS'], x_proto=app.config['TRUSTED_PROXY_HOPS'])
+
+# Límite de peticiones por cliente (IP o X-API-Key con cuota) con token bucket: RATELIMIT_RATE tokens
+# por segundo y ráfagas de RATELIMIT_BURST; los listados completos cuestan más (ratelimit.py).
+# Desactivado por defecto: detrás de un proxy activarlo solo junto con TRUSTED_PROXY_HOPS, o
+# todos los clientes compartirían el cubo de la IP del proxy.
+# Con varios workers usar RATELIMIT_STORAGE=redis para que el límite sea global.
+app.config['RATELIMIT_ENABLED'] = is_truthy(os.getenv("RATELIMIT_ENABLED", "false"))
+app.config['RATELIMIT_RATE'] = float(os.getenv("RATELIMIT_RATE", 10))
+app.config['RATELIMIT_BURST'] = float(os.getenv("RATELIMIT_BURST", 50))
+app.config['RATELIMIT_STORAGE'] = os.getenv("RATELIMIT_STORAGE", "memory")
+app.config['RATELIMIT_STORAGE_URL'] = os.getenv("RATELIMIT_STORAGE_URL") or os.getenv("CACHE_URL")
+app.config['RATELIMIT_QUOTAS'] = ratelimit.parse_quotas(os.getenv("RATELIMIT_QUOTAS"))
+ratelimit.init_app(app)
+
+# Caché de lectura para los datos de referencia (People, Planets, Vehicles).
+# Se invalida sola tras cada commit que toque esas tablas, también desde el admin.
+# Con varios workers de gunicorn usar CACHE_BACKEND=file o CACHE_BACKEND=redis
+# para compartir las entradas y las invalidaciones entre todos ellos. Con memory las rutas
+# @conditional no emiten ETag ni responden 304 (cada worker tendría sus propias versiones).
+app.config['CACHE_BACKEND'] = os.getenv("CACHE_BACKEND", "memory")
+app.config['CACHE_URL'] = os.getenv("CACHE_URL")
+app.config['CACHE_MAX_ENTRIES'] = int(os.getenv("CACHE_MAX_ENTRIES", 1024))
+app.config['CACHE_TTL'] = int(os.getenv("CACHE_TTL", 300))
+catalogue_cache = CatalogueCache(create_backend(
+    app.config['CACHE_BACKEND'],
+    app.config['CACHE_URL'],
+    max_entries=app.config['CACHE_MAX_ENTRIES'],
+    ttl=app.config['CACHE_TTL'],
+))
+on_change(catalogue_cache.handle_changes)
+app.extensions["catalogue_cache"] = catalogue_cache
+# El índice de autocompletado se recarga si la versión de la tabla cambia por otra vía.
+# Con memory las escrituras de otros workers no la mueven: se recarga cada AUTOCOMPLETE_MAX_AGE segundos.
+autocomplete_index.version_source = catalogue_cache.version
+if not catalogue_cache.backend.shared:
+    autocomplete_index.max_age = int(os.getenv("AUTOCOMPLETE_MAX_AGE", 60))
+
+# Réplicas de lectura opcionales (URLs separadas por comas). Las peticiones GET leen de
+# ellas en round-robin salvo las tablas escritas hace menos de REPLICA_STICKY_SECONDS.
+# La hora de la última escritura sale del backend de la caché: con memory sería la de
+# cada worker y quien escribe en uno leería de una réplica atrasada desde otro.
+replica_urls = [url.strip().replace("postgres://", "postgresql://")
+                for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+if replica_urls and not catalogue_cache.backend.shared:
+    raise RuntimeError(
+        "DATABASE_REPLICA_URLS needs a cache backend shared by every worker to track recent "
+        "writes: set CACHE_BACKEND=redis (or CACHE_BACKEND=file when all workers run on one host)"
+    )
+replica_router = ReplicaRouter(
+    replica_urls,
+    last_modified=catalogue_cache.last_modified,
+    sticky_seconds=int(os.getenv("REPLICA_STICKY_SECONDS", 5)),
+    health_interval=int(os.getenv("REPLICA_HEALTH_INTERVAL", 10)),
+    connect_timeout=int(os.getenv("REPLICA_CONNECT_TIMEOUT", 3)),
+) if replica_urls else None
+
+@app.before_request
+def route_reads_to_replicas():
+    if replica_router is not None and request.method in ("GET", "HEAD"):
+        db.session.info["replica_router"] = replica_router
+
+# Cache-Control por endpoint, p. ej. {"get_people": "public, max-age=60"}
+app.config['CACHE_CONTROL'] = {}
+CACHED_MODELS = (People, Planets, Vehicles)
+
 # Handle/serialize errors like a JSON object
 @app.errorhandler(APIException)
 def handle_invalid_usage(error):
@@ -36,33 +153,232 @@ def handle_invalid_usage(error):
 def sitemap():
     return generate_sitemap(app)
 
+# Contadores de la caché del catálogo (aciertos, fallos, expulsiones)
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    stats = catalogue_cache.stats()
+    stats["compressed_bodies"] = app.extensions["compression"].bodies.stats()
+    return jsonify(stats), 200
+
+
+# Operadores admitidos en los filtros numéricos, p. ej. ?population_gt=1000000
+NUMERIC_OPERATORS = {
+    "gt": lambda column, value: column > value,
+    "gte": lambda column, value: column >= value,
+    "lt": lambda column, value: column < value,
+    "lte": lambda column, value: column <= value,
+}
+
+# Traduce los filtros (?gender=, ?diameter_gt=...) y el orden (?sort=-diameter) a SQL.
+# Solo se admiten columnas indexadas: las numéricas "sombra" y las de filter_fields.
+def parse_list_query(model, args):
+    numeric_fields = getattr(model, "numeric_fields", {})
+    filter_fields = getattr(model, "filter_fields", ())
+    conditions = []
+
+    for name, value in args.items():
+        if name in filter_fields:
+            conditions.append(getattr(model, name) == value)
+            continue
+        field, _, operator = name.rpartition("_")
+        if field in numeric_fields and operator in NUMERIC_OPERATORS:
+            try:
+                number = float(value)
+            except ValueError:
+                raise APIException(f"'{name}' must be a number", status_code=400)
+            conditions.append(NUMERIC_OPERATORS[operator](getattr(model, numeric_fields[field]), number))
+
+    sort_column, descending = None, False
+    sort = args.get("sort")
+    if sort:
+        descending = sort.startswith("-")
+        field = sort.lstrip("-")
+        if field in numeric_fields:
+            sort_column = getattr(model, numeric_fields[field])
+        elif field != "id":
+            allowed = ", ".join(["id"] + list(numeric_fields))
+            raise APIException(f"Cannot sort by '{field}'. Allowed: {allowed}", status_code=400)
+        elif descending:
+            raise APIException("Descending order is only available for numeric fields", status_code=400)
+    return conditions, sort_column, descending
+
+
+# Estado del pool de conexiones (conexiones en uso, overflow, tiempos de espera)
+@app.route('/pool/stats', methods=['GET'])
+def get_pool_stats():
+    stats = {"primary": pool_stats(db.engine)}
+    if replica_router is not None:
+        stats["routing"] = replica_router.stats()
+        for position, engine in enumerate(replica_router.engines):
+            stats[f"replica{position}"] = pool_stats(engine)
+    return jsonify(stats), 200
+
+
+# Máximo de ids aceptados en ?ids=
+MAX_IDS = 100
+
+# Lista de ?ids=1,5,9 sin repetidos, en el orden pedido
+def parse_ids(value):
+    try:
+        ids = list(dict.fromkeys(int(item) for item in value.split(",") if item.strip()))
+    except ValueError:
+        raise APIException("'ids' must be a comma separated list of integers", status_code=400)
+    if not ids:
+        raise APIException("'ids' must not be empty", status_code=400)
+    if len(ids) > MAX_IDS:
+        raise APIException(f"At most {MAX_IDS} ids per request", status_code=400)
+    return ids
+
+
+# Varias filas por id (?ids=1,5,9) con un único WHERE id IN (...), en el orden pedido.
+# En los modelos cacheados cada fila usa la misma entrada que /<tabla>/<id> y solo
+# las que no están en caché van a la consulta.
+def ids_data(session, model, args, cache=None):
+    ids = parse_ids(args["ids"])
+    if any(name in args for name in ("all", "after", "sort")) or parse_list_query(model, args)[0]:
+        raise APIException("'ids' cannot be combined with filters, sort, all or after", status_code=400)
+    serializer = SERIALIZERS[model].parse_fields(args.get("fields"))
+
+    def load(entity_ids):
+        rows = session.execute(serializer.select().where(model.id.in_(entity_ids)))
+        found = {row.id: serializer.to_dict(row) for row in rows}
+        return [found.get(entity_id) for entity_id in entity_ids]
+
+    if model in CACHED_MODELS:
+        keys = [("item", entity_id, serializer.fields) for entity_id in ids]
+        rows = (cache or catalogue_cache).get_or_set_many(
+            model.__tablename__, keys, lambda missing: load([key[1] for key in missing])
+        )
+    else:
+        rows = load(ids)
+    results = [row for row in rows if row is not None]
+    return {
+        "results": results,
+        "count": len(results),
+        "missing": [entity_id for entity_id, row in zip(ids, rows) if row is None],
+    }
+
+
+# Datos de un listado (página o lista completa con ?all=true), pasando por la caché.
+# Recibe la sesión, los argumentos y opcionalmente la caché para poder usarse también
+# desde src/asgi.py (que pasa una que no bloquea el bucle de eventos).
+def collection_data(session, model, args, cache=None):
+    if "ids" in args:
+        return ids_data(session, model, args, cache)
+    load_all = is_truthy(args.get("all", "false"))
+    # Solo se seleccionan las columnas pedidas en ?fields=
+    serializer = SERIALIZERS[model].parse_fields(args.get("fields"))
+    conditions, sort_column, descending = parse_list_query(model, args)
+    stmt = serializer.select().where(*conditions)
+
+    def load():
+        if load_all:
+            # Los NULL al final con "col IS NULL" en el ORDER BY (MySQL no admite NULLS LAST),
+            # en el mismo orden que las páginas de paginate
+            if sort_column is None:
+                order = [model.id]
+            elif descending:
+                order = [sort_column.is_(None), sort_column.desc(), model.id.desc()]
+            else:
+                order = [sort_column.is_(None), sort_column.asc(), model.id]
+            return serializer.to_dicts(session.execute(stmt.order_by(*order)))
+        return paginate(session, serializer, args, stmt, sort_column, descending)
+
+    if model in CACHED_MODELS:
+        key = ("list", sorted(args.items(multi=True)))
+        return (cache or catalogue_cache).get_or_set(model.__tablename__, key, load)
+    return load()
+
+
+# Un listado vacío es un 404, salvo en las páginas siguientes a la primera y en ?ids=,
+# que responde 200 con results vacío y los ids que no existen en missing
+def is_empty_collection(data, args):
+    if isinstance(data, list):
+        return not data
+    return not data["results"] and not args.get("after") and "missing" not in data
+
+
+# Respuesta común para los listados: paginada por cursor salvo que se pida ?all=true
+def list_collection(model, not_found_msg):
+    data = collection_data(db.session, model, request.args)
+    if is_empty_collection(data, request.args):
+        return jsonify({"msg": not_found_msg}), 404
+    return jsonify(data), 200
+
+
+# Una fila serializada (o None) pasando por la caché del catálogo
+def item_data(session, model, item_id, args, cache=None):
+    serializer = SERIALIZERS[model].parse_fields(args.get("fields"))
+
+    def load():
+        row = session.execute(serializer.select().where(model.id == item_id)).first()
+        return serializer.to_dict(row) if row else None
+
+    if model in CACHED_MODELS:
+        return (cache or catalogue_cache).get_or_set(model.__tablename__, ("item", item_id, serializer.fields), load)
+    return load()
+
+
+def get_item(model, item_id):
+    return item_data(db.session, model, item_id, request.args)
+
+
+# Filas leídas del cursor del servidor por cada trozo de la exportación
+EXPORT_BATCH_SIZE = 1000
+
+# Exportación completa en streaming: la memoria no crece con el número de filas
+def export_collection(model):
+    output = request.args.get("format", "json")
+    if output not in ("json", "ndjson"):
+        raise APIException("'format' must be 'json' or 'ndjson'", status_code=400)
+
+    serializer = SERIALIZERS[model].parse_fields(request.args.get("fields"))
+
+    def chunks():
+        # Filas Core (tuplas) leídas en bloques: no se crean objetos ORM
+        result = db.session.execute(
+            serializer.select().order_by(model.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        for partition in result.partitions():
+            yield serializer.to_dicts(partition)
+
+    if output == "ndjson":
+        return Response(stream_with_context(stream_ndjson(chunks(), app.json.dumps)), mimetype="application/x-ndjson")
+    return Response(stream_with_context(stream_json_array(chunks(), app.json.dumps)), mimetype="application/json")
+
 
 # Endpoint People
 
 # Endpoint para obtener todas las personas de la base de datos.
 @app.route('/people', methods=['GET'])
+@conditional('people')
 def get_people():
-    people = People.query.all()  # Consulta todos los registros de la tabla People
-    
-    if not people:  # Si no hay usuarios en la lista
-        return jsonify({"msg": "No people found"}), 404
-    
-    # Devuelve los datos serializados en JSON
-    return jsonify([person.serialize() for person in people]), 200
+    # Paginado por cursor (?limit=&after=); ?all=true devuelve la lista completa y ?ids=1,5,9 esas filas
+    return list_collection(People, "No people found")
+
+
+# Exportación completa en streaming (?format=json|ndjson)
+@app.route('/people/export', methods=['GET'])
+@conditional('people')
+def export_people():
+    return export_collection(People)
 
 
 # Endpoint para recuperar una sola persona de la base de datos
 @app.route('/people/<int:people_id>', methods=['GET'])
+@conditional('people')
 def get_one_people(people_id):
     try:
         # Se busca a la persona por su ID
-        person = People.query.get(people_id)
+        person = get_item(People, people_id)
         
         # Si se encuentra la persona, se devuelve como respuesta JSON
         if person:
-            return jsonify(person.serialize()), 200
+            return jsonify(person), 200
         else:
             return jsonify({"message": "People not found"}), 404
+    except APIException:
+        raise
     except Exception as e:
         return jsonify({"message": str(e)}), 500
 
@@ -71,148 +387,70 @@ def get_one_people(people_id):
 
 # Endpoint para obtener todos los planetas de la base de datos.
 @app.route('/planets', methods=['GET'])
+@conditional('planets')
 def get_planets():
-    planets = Planets.query.all()  # Consulta todos los registros de la tabla Planets
-    
-    if not planets:  # Si no hay planetas en la lista
-        return jsonify({"msg": "No planets found"}), 404
-    
-    # Devuelve los datos serializados en JSON
-    return jsonify([el.serialize() for el in planets]), 200
+    # Paginado por cursor (?limit=&after=); ?all=true devuelve la lista completa y ?ids=1,5,9 esas filas
+    return list_collection(Planets, "No planets found")
+
+
+# Exportación completa en streaming (?format=json|ndjson)
+@app.route('/planets/export', methods=['GET'])
+@conditional('planets')
+def export_planets():
+    return export_collection(Planets)
 
 
 # Endpoint para recuperar una sola persona de la base de datos
 @app.route('/planets/<int:planets_id>', methods=['GET'])
+@conditional('planets')
 def get_one_planet(planets_id):
     try:
         # Se busca a la persona por su ID
-        planets = Planets.query.get(planets_id)
+        planets = get_item(Planets, planets_id)
         
         # Si se encuentra la persona, se devuelve como respuesta JSON
         if planets:
-            return jsonify(planets.serialize()), 200
+            return jsonify(planets), 200
         else:
             return jsonify({"message": "Planets not found"}), 404
+    except APIException:
+        raise
     except Exception as e:
         return jsonify({"message": str(e)}), 500
 
 
-# Endpoint para Eliminar persona favorita
-@app.route('/favorite/people/<int:people_id>', methods=['DELETE'])
-def delete_favorite_people(people_id):
-    try:
-        request_body = request.json
-        if not request_body or not isinstance(request_body, dict):
-            return jsonify({"message": "Invalid or empty request body"}), 400
-
-        user_id = request_body.get("user_id")
-        if not user_id:
-            return jsonify({"message": "Missing required field: 'user_id'"}), 400
-
-        user = Users.query.get(user_id)
-        if not user:
-            return jsonify({"message": "User not found"}), 404
-
-        favorite = Favorites.query.filter_by(user_id=user_id, favorite_id=people_id, favorite_type="people").first()
-        if not favorite:
-            return jsonify({"message": f"Favorite people with ID {people_id} not found for user {user_id}"}), 404
-
-        db.session.delete(favorite)
-        db.session.commit()
-
-        return jsonify({"message": f"Favorite people with ID {people_id} deleted successfully"}), 200
-
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"message": str(e)}), 500
-    
-
-# Endpoint para eliminar un planeta favorito con el id proporcionado
-@app.route('/favorite/planet/<int:planet_id>', methods=['DELETE'])
-def delete_favorite_planet(planet_id):
-    try:
-        request_body = request.json
-        if not request_body or not isinstance(request_body, dict):
-            return jsonify({"message": "Invalid or empty request body"}), 400
-
-        user_id = request_body.get("user_id")
-        if not user_id:
-            return jsonify({"message": "Missing required field: 'user_id'"}), 400
-
-        user = Users.query.get(user_id)
-        if not user:
-            return jsonify({"message": "User not found"}), 404
-
-        favorite = Favorites.query.filter_by(user_id=user_id, favorite_id=planet_id, favorite_type="planet").first()
-        if not favorite:
-            return jsonify({"message": f"Favorite planet with ID {planet_id} not found for user {user_id}"}), 404
-
-        db.session.delete(favorite)
-        db.session.commit()
-
-        return jsonify({"message": f"Favorite planet with ID {planet_id} deleted successfully"}), 200
-
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"message": str(e)}), 500
-
-
-# Endpoint para eliminar un vehicle favorito con el id proporcionado
-@app.route('/favorite/vehicle/<int:vehicle_id>', methods=['DELETE'])
-def delete_favorite_vehicle(vehicle_id):
-    try:
-        request_body = request.json
-        if not request_body or not isinstance(request_body, dict):
-            return jsonify({"message": "Invalid or empty request body"}), 400
-
-        user_id = request_body.get("user_id")
-        if not user_id:
-            return jsonify({"message": "Missing required field: 'user_id'"}), 400
-
-        user = Users.query.get(user_id)
-        if not user:
-            return jsonify({"message": "User not found"}), 404
-
-        favorite = Favorites.query.filter_by(user_id=user_id, favorite_id=vehicle_id, favorite_type="vehicle").first()
-        if not favorite:
-            return jsonify({"message": f"Favorite vehicle with ID {vehicle_id} not found for user {user_id}"}), 404
-
-        db.session.delete(favorite)
-        db.session.commit()
-
-        return jsonify({"message": f"Favorite vehicle with ID {vehicle_id} deleted successfully"}), 200
-
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"message": str(e)}), 500
-
-
 # Endpoint Vehicles
 
 # Endpoint para obtener todos los vehículos de la base de datos.
 @app.route('/vehicles', methods=['GET'])
+@conditional('vehicles')
 def get_vehicles():
-    vehicles = Vehicles.query.all()  # Consulta todos los registros de la tabla vehicles
-    
-    if not vehicles:  # Si no hay vehículos en la lista
-        return jsonify({"msg": "No vehicles found"}), 404
-    
-    # Devuelve los datos serializados en JSON
-    return jsonify([el.serialize() for el in vehicles]), 200
+    # Paginado por cursor (?limit=&after=); ?all=true devuelve la lista completa y ?ids=1,5,9 esas filas
+    return list_collection(Vehicles, "No vehicles found")
+
+
+# Exportación completa en streaming (?format=json|ndjson)
+@app.route('/vehicles/export', methods=['GET'])
+@conditional('vehicles')
+def export_vehicles():
+    return export_collection(Vehicles)
 
 
 # Endpoint para recuperar un solo vehículo de la base de datos
 @app.route('/vehicles/<int:vehicles_id>', methods=['GET'])
+@conditional('vehicles')
 def get_one_vehicle(vehicles_id):
     try:
         # Se busca al vehículo por su ID
-        vehicle = Vehicles.query.get(vehicles_id)
+        vehicle = get_item(Vehicles, vehicles_id)
         
         # Si se encuentra el vehículo, se devuelve como respuesta JSON
         if vehicle:
-            return jsonify(vehicle.serialize()), 200
+            return jsonify(vehicle), 200
         else:
             return jsonify({"message": "Vehicle not found"}), 404
+    except APIException:
+        raise
     except Exception as e:
         return jsonify({"message": str(e)}), 500
 
@@ -221,28 +459,27 @@ def get_one_vehicle(vehicles_id):
 
 # Endpoint para obtener todas los usuarios de la base de datos.
 @app.route('/users', methods=['GET'])
+@conditional('users')
 def get_users():
-    users = Users.query.all()  # Consulta todos los registros de la tabla Users
-    
-    if not users:  # Si no hay usuarios en la lista
-        return jsonify({"msg": "No users found"}), 404
-    
-    # Devuelve los datos serializados en JSON
-    return jsonify([user.serialize() for user in users]), 200
+    # Paginado por cursor (?limit=&after=); ?all=true devuelve la lista completa y ?ids=1,5,9 esas filas
+    return list_collection(Users, "No users found")
 
 
 # Endpoint para recuperar un solo usuario de la base de datos
 @app.route('/users/<int:users_id>', methods=['GET'])
+@conditional('users')
 def get_user(users_id):
     try:
         # Se busca al usuario por su ID
-        user = Users.query.get(users_id)
+        user = get_item(Users, users_id)
         
         # Si se encuentra el usuario, se devuelve como respuesta JSON
         if user:
-            return jsonify(user.serialize()), 200
+            return jsonify(user), 200
         else:
             return jsonify({"message": "User not found"}), 404
+    except APIException:
+        raise
     except Exception as e:
         return jsonify({"message": str(e)}), 500
 
@@ -250,31 +487,142 @@ def get_user(users_id):
 # Endpoint Favorites
 
 # Endpoint para obtener todos los favoritos de un usuario
+# Con ?expand=true se incluye cada entidad completa, resuelta con un IN (...) por tipo
 @app.route('/users/<int:user_id>/favorites', methods=['GET'])
+@conditional('users', 'favorites', 'people', 'planets', 'vehicles')
 def get_user_favorites(user_id):
     try:
-        # Se busca al usuario por su ID
-        user = Users.query.get(user_id)
-        
-        if not user:
+        # Una sola consulta comprueba el usuario y trae sus favoritos (LEFT JOIN)
+        serializer = SERIALIZERS[Favorites]
+        rows = db.session.execute(
+            select(Users.id.label("owner_id"), *serializer.columns)
+            .outerjoin_from(Users, Favorites, Favorites.user_id == Users.id)
+            .where(Users.id == user_id)
+            .order_by(Favorites.id)
+        ).all()
+
+        if not rows:
             return jsonify({"message": "User not found"}), 404
         
         # Se obtiene la lista de favoritos del usuario
-        favorites = Favorites.query.filter_by(user_id=user_id).all()
+        favorites = [serializer.to_dict(row[1:]) for row in rows if row.id is not None]
         
         if not favorites:
             return jsonify({"message": "No favorites found for this user"}), 404
+
+        if is_truthy(request.args.get("expand", "false")):
+            entities = resolve_favorites(favorites)
+            for item in favorites:
+                model = FAVORITE_MODELS.get(item["favorite_type"])
+                item["entity"] = entities.get((model, item["favorite_id"]))
         
         # Devuelve los favoritos serializados en JSON
-        return jsonify([favorite.serialize() for favorite in favorites]), 200
+        return jsonify(favorites), 200
     
     except Exception as e:
         return jsonify({"message": str(e)}), 500
+
+
+# Carga las entidades de una lista de favoritos agrupando los ids por modelo
+def resolve_favorites(favorites):
+    return resolve_entities(
+        (FAVORITE_MODELS.get(favorite["favorite_type"]), favorite["favorite_id"]) for favorite in favorites
+    )
+
+
+# Carga entidades [(modelo, id)] con una consulta IN (...) por modelo
+def resolve_entities(pairs):
+    ids_by_model = {}
+    for model, entity_id in pairs:
+        if model is not None:
+            ids_by_model.setdefault(model, set()).add(entity_id)
+
+    entities = {}
+    for model, ids in ids_by_model.items():
+        serializer = SERIALIZERS[model]
+        for row in db.session.execute(serializer.select().where(model.id.in_(ids))):
+            entities[(model, row.id)] = serializer.to_dict(row)
+    return entities
     
 
-# Endpoint para añadir un nuevo favorito de tipo "people" al usuario actual
-@app.route('/favorites/people/<int:people_id>', methods=['POST'])
-def add_favorite_people(people_id):
+# Inserta un favorito con una sola sentencia:
+#   INSERT INTO favorites ... SELECT ... WHERE EXISTS(usuario) AND EXISTS(entidad) ON CONFLICT DO NOTHING
+# Devuelve (favorito serializado o None, estado); solo si no se inserta nada se hacen
+# consultas extra para saber el motivo ("exists", "user_not_found" o "entity_not_found").
+def insert_favorite(user_id, favorite_type, favorite_id):
+    model = FAVORITE_MODELS[favorite_type]
+    dialect = db.session.get_bind().dialect
+    source = select(
+        literal(user_id, Integer), literal(favorite_type, FavoriteType()), literal(favorite_id, Integer)
+    ).where(
+        select(Users.id).where(Users.id == user_id).exists(),
+        select(model.id).where(model.id == favorite_id).exists(),
+    )
+    stmt = insert_ignore_duplicates(Favorites, dialect.name).from_select(
+        ["user_id", "favorite_type", "favorite_id"], source
+    )
+
+    if dialect.insert_returning:
+        row = db.session.execute(stmt.returning(*Favorites.__table__.columns)).first()
+        if row is not None:
+            adjust_favorite_counts(db.session, model, [favorite_id], 1)
+            mark_changed(db.session, Favorites.__tablename__, row.id)
+            db.session.commit()
+            return dict(row._mapping), "created"
+        created = False
+    else:
+        created = db.session.execute(stmt).rowcount > 0
+        if created:
+            adjust_favorite_counts(db.session, model, [favorite_id], 1)
+            mark_changed(db.session, Favorites.__tablename__)
+    db.session.commit()
+
+    serializer = SERIALIZERS[Favorites]
+    favorite = db.session.execute(serializer.select().where(
+        Favorites.user_id == user_id,
+        Favorites.favorite_type == favorite_type,
+        Favorites.favorite_id == favorite_id,
+    )).first()
+    if favorite is not None:
+        return serializer.to_dict(favorite), "created" if created else "exists"
+    if db.session.get(Users, user_id) is None:
+        return None, "user_not_found"
+    return None, "entity_not_found"
+
+
+# Borra un favorito con un único DELETE ... RETURNING.
+# Devuelve "deleted", "user_not_found" o "not_found" (estos dos solo cuestan una consulta más).
+def remove_favorite(user_id, favorite_type, favorite_id):
+    stmt = delete(Favorites).where(
+        Favorites.user_id == user_id,
+        Favorites.favorite_type == favorite_type,
+        Favorites.favorite_id == favorite_id,
+    )
+    if db.session.get_bind().dialect.delete_returning:
+        deleted = db.session.execute(stmt.returning(Favorites.id)).first() is not None
+    else:
+        deleted = db.session.execute(stmt).rowcount > 0
+
+    if deleted:
+        # El contador de la entidad se descuenta en la misma transacción
+        adjust_favorite_counts(db.session, FAVORITE_MODELS[favorite_type], [favorite_id], -1)
+        mark_changed(db.session, Favorites.__tablename__)
+        db.session.commit()
+        return "deleted"
+    db.session.rollback()
+    if db.session.get(Users, user_id) is None:
+        return "user_not_found"
+    return "not_found"
+
+
+# Endpoints de favoritos, uno por acción para todos los tipos del registro
+# (register_favorite_type en models.py). Se mantienen las URLs antiguas:
+# POST /favorites/planet/<id> y DELETE /favorite/planet/<id> siguen funcionando.
+
+# Endpoint para añadir un favorito del tipo indicado al usuario del cuerpo
+@app.route('/favorites/<favorite_type:favorite_type>/<int:entity_id>', methods=['POST'])
+def add_favorite(favorite_type, entity_id):
+    label = favorite_type.capitalize()
     try:
         request_body = request.json
 
@@ -288,111 +636,315 @@ def add_favorite_people(people_id):
 
         user_id = request_body["user_id"]
 
-        # Validar que el usuario exista
-        user = Users.query.get(user_id)
-        if not user:
+        # Crear el nuevo favorito en una sola sentencia; el usuario y la entidad
+        # se validan dentro del propio INSERT (si ya existía no se duplica)
+        favorite, status = insert_favorite(user_id, favorite_type, entity_id)
+        if status == "user_not_found":
             return jsonify({"message": "User not found"}), 404
-
-        # Validar que el planeta exista
-        people = People.query.get(people_id)
-        if not people:
-            return jsonify({"message": "Planet not found"}), 404
-
-        # Crear el nuevo favorito
-        new_favorite = Favorites(user_id=user_id, favorite_id=people_id, favorite_type="people")
-
-        # Guardar el favorito en la base de datos
-        db.session.add(new_favorite)
-        db.session.commit()
+        if status == "entity_not_found":
+            return jsonify({"message": f"{label} not found"}), 404
+        if status == "exists":
+            return jsonify(favorite, {"message": f"{label} is already a favorite"}), 200
 
         # Respuesta exitosa
-        return jsonify(new_favorite.serialize(), {"message": "People favorite added successfully"}), 200
+        return jsonify(favorite, {"message": f"{label} favorite added successfully"}), 200
 
     except Exception as e:
         return jsonify({"message": str(e)}), 500
-    
 
-# Endpoint para añadir un nuevo favorito de tipo "planet" al usuario actual
-@app.route('/favorites/planet/<int:planet_id>', methods=['POST'])
-def add_favorite_planet(planet_id):
+
+# Endpoint para eliminar un favorito del tipo indicado del usuario del cuerpo
+@app.route('/favorites/<favorite_type:favorite_type>/<int:entity_id>', methods=['DELETE'])
+@app.route('/favorite/<favorite_type:favorite_type>/<int:entity_id>', methods=['DELETE'])
+def delete_favorite(favorite_type, entity_id):
     try:
         request_body = request.json
+        if not request_body or not isinstance(request_body, dict):
+            return jsonify({"message": "Invalid or empty request body"}), 400
 
-        # Validar que el cuerpo de la solicitud no esté vacío
-        if not request_body:
-            return jsonify({"message": "Request body is empty"}), 400
-
-        # Validar que los campos necesarios estén presentes
-        if "user_id" not in request_body:
+        user_id = request_body.get("user_id")
+        if not user_id:
             return jsonify({"message": "Missing required field: 'user_id'"}), 400
 
-        user_id = request_body["user_id"]
-
-        # Validar que el usuario exista
-        user = Users.query.get(user_id)
-        if not user:
+        # Un único DELETE; solo si no borra nada se averigua el motivo
+        status = remove_favorite(user_id, favorite_type, entity_id)
+        if status == "user_not_found":
             return jsonify({"message": "User not found"}), 404
+        if status == "not_found":
+            return jsonify({"message": f"Favorite {favorite_type} with ID {entity_id} not found for user {user_id}"}), 404
 
-        # Validar que el planeta exista
-        planet = Planets.query.get(planet_id)
-        if not planet:
-            return jsonify({"message": "Planet not found"}), 404
-
-        # Crear el nuevo favorito
-        new_favorite = Favorites(user_id=user_id, favorite_id=planet_id, favorite_type="planet")
-
-        # Guardar el favorito en la base de datos
-        db.session.add(new_favorite)
-        db.session.commit()
-
-        # Respuesta exitosa
-        return jsonify(new_favorite.serialize(), {"message": "Planet favorite added successfully"}), 200
+        return jsonify({"message": f"Favorite {favorite_type} with ID {entity_id} deleted successfully"}), 200
 
     except Exception as e:
+        db.session.rollback()
         return jsonify({"message": str(e)}), 500
 
 
-# Endpoint para añadir un nuevo favorito de tipo "planet" al usuario actual
-@app.route('/favorites/vehicle/<int:vehicle_id>', methods=['POST'])
-def add_favorite_vehicle(vehicle_id):
+# Endpoint Leaderboard
+
+# Entidades más veces marcadas como favoritas: /leaderboard/<tipo>?limit=
+# Lee el top-k de ix_<tabla>_favorite_count (favorite_count, id) sin agregar la tabla favorites
+@app.route('/leaderboard/<favorite_type:favorite_type>', methods=['GET'])
+@conditional('favorites', 'people', 'planets', 'vehicles')
+def get_leaderboard(favorite_type):
+    model = FAVORITE_MODELS[favorite_type]
+    limit = parse_limit(request.args)
+    serializer = SERIALIZERS[model]
+
+    def load():
+        rows = db.session.execute(
+            select(model.favorite_count, *serializer.columns)
+            .where(model.favorite_count > 0)
+            .order_by(model.favorite_count.desc(), model.id.desc())
+            .limit(limit)
+        ).all()
+        return [{"favorite_count": row[0], "entity": serializer.to_dict(row[1:])} for row in rows]
+
+    # Los contadores cambian con cada favorito: la clave lleva también la versión de favorites
+    key = ("leaderboard", favorite_type, limit, catalogue_cache.version(model.__tablename__))
+    results = catalogue_cache.get_or_set(Favorites.__tablename__, key, load)
+    return jsonify({"type": favorite_type, "results": results, "count": len(results)}), 200
+
+
+# Recalcula favorite_count desde la tabla favorites: `flask favorites-recount`
+@app.cli.command("favorites-recount")
+def favorites_recount():
+    with db.engine.begin() as connection:
+        recount_favorites(connection)
+    catalogue_cache.invalidate(Favorites.__tablename__)
+    print("Favorite counters recomputed")
+
+
+# Endpoint Search
+
+# Búsqueda de texto completo en people, planets y vehicles: /search?q=&types=&limit=&offset=
+@app.route('/search', methods=['GET'])
+@conditional('people', 'planets', 'vehicles')
+def search_catalogue():
+    query = request.args.get("q", "").strip()
+    if not query:
+        raise APIException("Missing required parameter: 'q'", status_code=400)
+    limit = parse_limit(request.args)
     try:
-        request_body = request.json
+        offset = max(int(request.args.get("offset", 0)), 0)
+    except ValueError:
+        raise APIException("'offset' must be an integer", status_code=400)
+    types = [name for name in request.args.get("types", "").split(",") if name]
+    unknown = [name for name in types if name not in search.SEARCH_MODELS]
+    if unknown:
+        raise APIException(f"Unknown types: {', '.join(unknown)}", status_code=400)
+
+    # El índice lo crean la migración o `flask search-reindex`, nunca una petición GET
+    connection = db.session.connection()
+    if not search.index_exists(connection):
+        return jsonify({"message": "Search index not built yet, run `flask search-reindex`"}), 503
+
+    hits = search.search(connection, query, types, limit + 1, offset)
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+    entities = resolve_entities((search.SEARCH_MODELS[entity_type], entity_id) for entity_type, entity_id, _ in hits)
+
+    results = []
+    for entity_type, entity_id, score in hits:
+        entity = entities.get((search.SEARCH_MODELS[entity_type], entity_id))
+        if entity is not None:
+            results.append({"type": entity_type, "id": entity_id, "score": score, "entity": entity})
+
+    return jsonify({
+        "results": results,
+        "count": len(results),
+        "limit": limit,
+        "offset": offset,
+        "next_offset": offset + limit if has_more else None,
+    }), 200
+
+
+# Máximo de sugerencias por petición de autocompletado
+MAX_AUTOCOMPLETE_RESULTS = 50
+
+# Autocompletado de nombres desde un índice en memoria: /autocomplete?prefix=&types=&limit=
+@app.route('/autocomplete', methods=['GET'])
+def autocomplete():
+    prefix = request.args.get("prefix", "").strip()
+    if not prefix:
+        raise APIException("Missing required parameter: 'prefix'", status_code=400)
+    types = [name for name in request.args.get("types", "").split(",") if name] or list(AUTOCOMPLETE_MODELS)
+    unknown = [name for name in types if name not in AUTOCOMPLETE_MODELS]
+    if unknown:
+        raise APIException(f"Unknown types: {', '.join(unknown)}", status_code=400)
+    try:
+        limit = min(max(int(request.args.get("limit", 10)), 1), MAX_AUTOCOMPLETE_RESULTS)
+    except ValueError:
+        raise APIException("'limit' must be an integer", status_code=400)
+
+    # Solo se consulta la base de datos la primera vez o si otro proceso cambió la tabla
+    for entity_type in types:
+        autocomplete_index.ensure_loaded(db.session, entity_type)
+
+    return jsonify({"results": autocomplete_index.lookup(prefix, types, limit)}), 200
+
+
+# Reconstruye el índice de búsqueda: `flask search-reindex`
+@app.cli.command("search-reindex")
+def search_reindex():
+    with db.engine.begin() as connection:
+        search.rebuild_index(connection)
+    print("Search index rebuilt")
+
+
+# Datos sintéticos para pruebas y benchmarks: `flask seed --rows 100000`
+register_seed_command(app)
+
+
+# Máximo de elementos aceptados en una petición batch de favoritos
+MAX_BATCH_ITEMS = 500
+
+# Valida el cuerpo de una petición batch y devuelve [(posición, modelo, id)] y los resultados iniciales
+def parse_favorite_items(request_body):
+    items = request_body.get("items") if isinstance(request_body, dict) else request_body
+    if not isinstance(items, list) or not items:
+        raise APIException("Missing required field: 'items' (non-empty list of {type, id})", status_code=400)
+    if len(items) > MAX_BATCH_ITEMS:
+        raise APIException(f"Too many items, the maximum is {MAX_BATCH_ITEMS}", status_code=400)
+
+    parsed, results = [], []
+    for position, item in enumerate(items):
+        item = item if isinstance(item, dict) else {}
+        model = FAVORITE_MODELS.get(item.get("type"))
+        entity_id = item.get("id")
+        results.append({"type": item.get("type"), "id": entity_id, "status": "invalid"})
+        if model is not None and isinstance(entity_id, int) and not isinstance(entity_id, bool):
+            parsed.append((position, model, entity_id))
+    return parsed, results
+
+
+# Actualiza favorite_count de las entidades {(modelo, id)} con un UPDATE ... IN (...) por modelo
+def adjust_counts_by_model(pairs, delta):
+    ids_by_model = {}
+    for model, entity_id in pairs:
+        ids_by_model.setdefault(model, []).append(entity_id)
+    for model, ids in ids_by_model.items():
+        adjust_favorite_counts(db.session, model, ids, delta)
+
+
+# Condición sobre los favoritos del usuario para los pares {(modelo, id)}, agrupados por tipo
+def user_favorites_condition(user_id, pairs):
+    ids_by_type = {}
+    for model, entity_id in pairs:
+        ids_by_type.setdefault(FAVORITE_TYPE_NAMES[model], set()).add(entity_id)
+    return and_(
+        Favorites.user_id == user_id,
+        or_(*(and_(Favorites.favorite_type == favorite_type, Favorites.favorite_id.in_(ids))
+              for favorite_type, ids in ids_by_type.items())),
+    )
+
+
+# Sin RETURNING (MySQL) se leen antes los favoritos afectados con SELECT ... FOR UPDATE,
+# que los bloquea (y el hueco de los que faltan) hasta el commit; devuelve {(modelo, id)}
+def locked_favorites(condition):
+    rows = db.session.execute(
+        select(Favorites.favorite_type, Favorites.favorite_id).where(condition).with_for_update()
+    )
+    return {(FAVORITE_MODELS[row.favorite_type], row.favorite_id) for row in rows}
+
+
+# Endpoint para añadir varios favoritos a la vez en una sola transacción
+@app.route('/users/<int:user_id>/favorites/batch', methods=['POST'])
+def add_favorites_batch(user_id):
+    try:
+        parsed, results = parse_favorite_items(request.json)
 
-        # Validar que el cuerpo de la solicitud no esté vacío
-        if not request_body:
-            return jsonify({"message": "Request body is empty"}), 400
+        if db.session.get(Users, user_id) is None:
+            return jsonify({"message": "User not found"}), 404
 
-        # Validar que los campos necesarios estén presentes
-        if "user_id" not in request_body:
-            return jsonify({"message": "Missing required field: 'user_id'"}), 400
+        # Se comprueba la existencia de todas las entidades con una consulta por tipo
+        existing = set()
+        for model in {model for _, model, _ in parsed}:
+            ids = {entity_id for _, item_model, entity_id in parsed if item_model is model}
+            existing.update((model, row_id) for row_id in db.session.scalars(select(model.id).where(model.id.in_(ids))))
+
+        values, seen = [], set()
+        for position, model, entity_id in parsed:
+            if (model, entity_id) not in existing:
+                results[position]["status"] = "not_found"
+                continue
+            results[position]["status"] = "exists"
+            if (model, entity_id) not in seen:
+                seen.add((model, entity_id))
+                values.append({"user_id": user_id, "favorite_type": FAVORITE_TYPE_NAMES[model], "favorite_id": entity_id})
+
+        # Un único INSERT multi-fila; RETURNING (o los que ya estaban, sin él) indica cuáles eran nuevos
+        added = set()
+        if values:
+            dialect = db.session.get_bind().dialect
+            stmt = insert_ignore_duplicates(Favorites, dialect.name).values(values)
+            if dialect.insert_returning:
+                rows = db.session.execute(stmt.returning(Favorites.favorite_type, Favorites.favorite_id)).all()
+                added = {(FAVORITE_MODELS[row.favorite_type], row.favorite_id) for row in rows}
+            else:
+                before = locked_favorites(user_favorites_condition(user_id, seen))
+                db.session.execute(stmt)
+                added = seen - before
+            if added:
+                adjust_counts_by_model(added, 1)
+                mark_changed(db.session, Favorites.__tablename__)
+        db.session.commit()
 
-        user_id = request_body["user_id"]
+        for position, model, entity_id in parsed:
+            if (model, entity_id) in added and results[position]["status"] == "exists":
+                results[position]["status"] = "added"
+                added.discard((model, entity_id))
 
-        # Validar que el usuario exista
-        user = Users.query.get(user_id)
-        if not user:
-            return jsonify({"message": "User not found"}), 404
+        return jsonify({"results": results}), 200
 
-        # Validar que el vehicle exista
-        vehicle = Vehicles.query.get(vehicle_id)
-        if not vehicle:
-            return jsonify({"message": "Vehicle not found"}), 404
+    except APIException:
+        raise
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": str(e)}), 500
 
-        # Crear el nuevo favorito
-        new_favorite = Favorites(user_id=user_id, favorite_id=vehicle_id, favorite_type="vehicle")
 
-        # Guardar el favorito en la base de datos
-        db.session.add(new_favorite)
+# Endpoint para eliminar varios favoritos a la vez con un único DELETE
+@app.route('/users/<int:user_id>/favorites/batch', methods=['DELETE'])
+def delete_favorites_batch(user_id):
+    try:
+        parsed, results = parse_favorite_items(request.json)
+
+        if db.session.get(Users, user_id) is None:
+            return jsonify({"message": "User not found"}), 404
+
+        deleted = set()
+        if parsed:
+            condition = user_favorites_condition(user_id, {(model, entity_id) for _, model, entity_id in parsed})
+            stmt = delete(Favorites).where(condition)
+            if db.session.get_bind().dialect.delete_returning:
+                rows = db.session.execute(stmt.returning(Favorites.favorite_type, Favorites.favorite_id))
+                deleted = {(FAVORITE_MODELS[row.favorite_type], row.favorite_id) for row in rows}
+            else:
+                deleted = locked_favorites(condition)
+                if deleted:
+                    db.session.execute(stmt)
+            if deleted:
+                adjust_counts_by_model(deleted, -1)
+                mark_changed(db.session, Favorites.__tablename__)
         db.session.commit()
 
-        # Respuesta exitosa
-        return jsonify(new_favorite.serialize(), {"message": "Vehicle favorite added successfully"}), 200
+        for position, model, entity_id in parsed:
+            if (model, entity_id) in deleted:
+                results[position]["status"] = "deleted"
+                deleted.discard((model, entity_id))
+            else:
+                results[position]["status"] = "not_found"
+
+        return jsonify({"results": results}), 200
 
+    except APIException:
+        raise
     except Exception as e:
+        db.session.rollback()
         return jsonify({"message": str(e)}), 500
 
 
-
 # this only runs if `$ python src/app.py` is executed
 if __name__ == '__main__':
     PORT = int(os.environ.get('PORT', 3000))
@@ -0,0 +1,362 @@
+"""
+ASGI entry point: `uvicorn asgi:application --app-dir src`
+(optional dependencies: `pipenv install --categories "packages asgi"` or requirements-asgi.txt)
+
+The hot read endpoints (collections and detail of people, planets, vehicles and users)
+are served by async handlers on an async SQLAlchemy engine (aiosqlite/asyncpg), so one
+process can keep thousands of requests in flight while they wait on the database. They
+reuse the same models, serializers, cache and ETag logic as the Flask app. Every other
+route (favorites, search, admin, ...) is forwarded to the Flask app in a thread pool.
+"""
+import asyncio
+import io
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.util import await_only
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import http_date, parse_date, parse_etags
+from app import app as flask_app, catalogue_cache, collection_data, item_data, is_empty_collection
+from cache import CatalogueCache
+from compression import compress
+from conditional import (
+    DEFAULT_CACHE_CONTROL, compute_validators, not_modified_etag, representation_etags, validators_enabled,
+)
+from database import engine_options_from_env
+from metrics import (
+    RequestStats, current_request, request_duration, request_queries, request_db_duration,
+    response_size, serialization_duration, serialization_timer, server_timing,
+)
+from models import Users, People, Planets, Vehicles
+from ratelimit import LIMITED_MESSAGE
+from utils import APIException
+
+# Driver asíncrono para cada motor
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+# Ruta -> (modelo, endpoint Flask equivalente, mensaje 404)
+COLLECTION_ROUTES = {
+    "people": (People, "get_people", "No people found"),
+    "planets": (Planets, "get_planets", "No planets found"),
+    "vehicles": (Vehicles, "get_vehicles", "No vehicles found"),
+    "users": (Users, "get_users", "No users found"),
+}
+ITEM_ROUTES = {
+    "people": (People, "get_one_people", "People not found"),
+    "planets": (Planets, "get_one_planet", "Planets not found"),
+    "vehicles": (Vehicles, "get_one_vehicle", "Vehicle not found"),
+    "users": (Users, "get_user", "User not found"),
+}
+ROUTE_PATTERN = re.compile(r"^/(people|planets|vehicles|users)(?:/(\d+))?/?$")
+
+
+def async_database_url(url):
+    url = make_url(os.getenv("ASYNC_DATABASE_URL") or url)
+    backend = url.get_backend_name()
+    if backend in ASYNC_DRIVERS and "+" not in url.drivername:
+        url = url.set(drivername=ASYNC_DRIVERS[backend])
+    return url
+
+
+def async_engine_options(url):
+    options = engine_options_from_env(url.render_as_string(hide_password=False), name="async")
+    # Los motores asíncronos necesitan la versión asíncrona del pool
+    if options.pop("poolclass", None) is not None:
+        options["poolclass"] = AsyncAdaptedQueuePool
+    connect_args = options.pop("connect_args", {})
+    if url.get_backend_name() == "postgresql" and "options" in connect_args:
+        timeout = connect_args["options"].rsplit("=", 1)[-1]
+        options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+    return options
+
+
+database_url = async_database_url(flask_app.config["SQLALCHEMY_DATABASE_URI"])
+async_engine = create_async_engine(database_url, **async_engine_options(database_url))
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+class OffloopBackend:
+    """Cache backend proxy for code running inside AsyncSession.run_sync: every call to a
+    blocking backend (file, redis) runs in a worker thread and is awaited from the greenlet,
+    so the event loop keeps serving other requests meanwhile."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def __getattr__(self, name):
+        method = getattr(self.backend, name)
+
+        def offloaded(*args):
+            return await_only(asyncio.to_thread(method, *args))
+        return offloaded
+
+
+# Con un backend compartido (file, redis) las lecturas de caché de las rutas nativas no
+# bloquean el bucle; con memory son instantáneas y se usa la caché tal cual
+read_cache = CatalogueCache(OffloopBackend(catalogue_cache.backend)) if catalogue_cache.backend.blocking else catalogue_cache
+
+
+async def request_validators(path, model, args):
+    if catalogue_cache.backend.blocking:
+        return await asyncio.to_thread(compute_validators, catalogue_cache, (model.__tablename__,), path, args)
+    return compute_validators(catalogue_cache, (model.__tablename__,), path, args)
+
+
+# Compresión y cuerpos ya comprimidos compartidos con las rutas de Flask
+compressor = flask_app.extensions["compression"]
+# Limitador de peticiones de la app Flask (None si RATELIMIT_ENABLED=false)
+limiter = flask_app.extensions.get("ratelimit")
+
+# Hilos para las peticiones que se delegan en la app WSGI de Flask
+wsgi_executor = ThreadPoolExecutor(max_workers=int(os.getenv("ASGI_WSGI_THREADS", 16)))
+
+
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def send_response(send, status, body=b"", headers=()):
+    await send({"type": "http.response.start", "status": status, "headers": list(headers)})
+    await send({"type": "http.response.body", "body": body})
+
+
+def json_body(data):
+    with serialization_timer():
+        return flask_app.json.dumps_bytes(data) + b"\n"
+
+
+def client_address(scope, headers):
+    # Misma regla que ProxyFix(x_for=TRUSTED_PROXY_HOPS) en la app Flask: la entrada de
+    # X-Forwarded-For que añadió el proxy más lejano de los de confianza
+    remote_addr = (scope.get("client") or ("", 0))[0]
+    hops = flask_app.config["TRUSTED_PROXY_HOPS"]
+    forwarded = [value.strip() for value in headers.get("x-forwarded-for", "").split(",") if value.strip()]
+    if hops and len(forwarded) >= hops:
+        return forwarded[-hops]
+    return remote_addr
+
+
+async def check_rate_limit(scope, headers, endpoint, args):
+    # Mismo limitador (y mismo almacén) que el before_request de Flask
+    remote_addr = client_address(scope, headers)
+    api_key = headers.get("x-api-key")
+    if limiter.store.blocking:
+        # Redis es E/S bloqueante: fuera del bucle de eventos
+        return await asyncio.to_thread(limiter.check, endpoint, args, api_key, remote_addr)
+    return limiter.check(endpoint, args, api_key, remote_addr)
+
+
+def rate_limit_headers(decision):
+    return [(name.lower().encode(), value.encode()) for name, value in limiter.headers(decision)]
+
+
+async def handle_read(scope, send, model, endpoint, not_found_msg, item_id):
+    # Mismas métricas y cabecera Server-Timing que las rutas de Flask
+    started = time.perf_counter()
+    stats = RequestStats()
+    token = current_request.set(stats)
+    request_headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+    args = MultiDict(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True))
+    try:
+        decision = await check_rate_limit(scope, request_headers, endpoint, args) if limiter is not None else None
+        if decision is not None and not decision.allowed:
+            status, body = 429, json_body({"message": LIMITED_MESSAGE})
+            headers = [(b"content-type", b"application/json"), (b"access-control-allow-origin", b"*")]
+        else:
+            status, body, headers = await read_response(
+                scope, request_headers, args, model, endpoint, not_found_msg, item_id
+            )
+    finally:
+        current_request.reset(token)
+    if decision is not None:
+        headers.extend(rate_limit_headers(decision))
+    total = time.perf_counter() - started
+    labels = ("GET", endpoint, str(status))
+    request_duration.observe(total, *labels)
+    request_queries.observe(stats.queries, *labels)
+    request_db_duration.observe(stats.db_time, *labels)
+    serialization_duration.observe(stats.serialize_time, *labels)
+    response_size.observe(len(body), *labels)
+    headers.append((b"server-timing", server_timing(total, stats).encode()))
+    await send_response(send, status, body, headers)
+
+
+def etag_header(etag):
+    return (b"etag", f'"{etag}"'.encode())
+
+
+async def read_response(scope, headers, args, model, endpoint, not_found_msg, item_id):
+    # Mismas cabeceras que añade Flask-CORS al resto de rutas
+    response_headers = [(b"content-type", b"application/json"), (b"access-control-allow-origin", b"*")]
+
+    encoding = compressor.choose(headers.get("accept-encoding"))
+    validators = [
+        (b"cache-control", flask_app.config.get("CACHE_CONTROL", {}).get(endpoint, DEFAULT_CACHE_CONTROL).encode()),
+        (b"vary", b"Accept-Encoding"),
+    ]
+    etag = None
+    # Revalidación sin tocar la base de datos (misma lógica que @conditional), solo con
+    # un backend de caché compartido por todos los workers
+    if validators_enabled(catalogue_cache):
+        etag, last_modified = await request_validators(scope["path"], model, args)
+        etags = representation_etags(etag, encoding)
+        if_modified_since = parse_date(headers["if-modified-since"]) if "if-modified-since" in headers else None
+        validators.insert(0, (b"last-modified", http_date(last_modified).encode()))
+        matched = not_modified_etag(etags, last_modified, parse_etags(headers.get("if-none-match")), if_modified_since)
+        if matched:
+            # Como Werkzeug en las rutas Flask: un 304 no lleva cabeceras de entidad
+            entity_headers = (b"content-type", b"last-modified")
+            return 304, b"", [header for header in response_headers + [etag_header(matched)] + validators
+                              if header[0] not in entity_headers]
+        cached = compressor.bodies.get(etags[0]) if encoding else None
+        if cached is not None:
+            return 200, cached[1], response_headers + [etag_header(etags[0])] + validators + [(b"content-encoding", encoding.encode())]
+
+    try:
+        async with AsyncSessionLocal() as session:
+            if item_id is None:
+                data = await session.run_sync(collection_data, model, args, read_cache)
+                missing = is_empty_collection(data, args)
+            else:
+                data = await session.run_sync(item_data, model, item_id, args, read_cache)
+                missing = data is None
+    except APIException as error:
+        return error.status_code, json_body(error.to_dict()), response_headers
+    except Exception as error:
+        return 500, json_body({"message": str(error)}), response_headers
+
+    if missing:
+        key = "msg" if item_id is None else "message"
+        return 404, json_body({key: not_found_msg}), response_headers
+    body = json_body(data)
+    if encoding and len(body) >= compressor.min_size:
+        body = compress(body, encoding)
+        validators.append((b"content-encoding", encoding.encode()))
+        if etag is not None:
+            etag = etags[0]
+            compressor.bodies.set(etag, "application/json", body)
+    if etag is not None:
+        validators.insert(0, etag_header(etag))
+    return 200, body, response_headers + validators
+
+
+def wsgi_environ(scope, body):
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": "HTTP/" + scope.get("http_version", "1.1"),
+        "REMOTE_ADDR": (scope.get("client") or ("", 0))[0],
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for key, value in scope["headers"]:
+        name = key.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif name != "CONTENT_LENGTH":
+            name = "HTTP_" + name
+            environ[name] = environ[name] + "," + value if name in environ else value
+    return environ
+
+
+async def call_flask(scope, receive, send):
+    """Runs the Flask app in a worker thread and streams its response body back.
+
+    The whole WSGI call (including iterating the body) happens in one thread, so
+    generators using stream_with_context keep their application context."""
+    environ = wsgi_environ(scope, await read_body(receive))
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=8)
+
+    def put(item):
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def run():
+        def start_response(status, headers, exc_info=None):
+            put(("start", int(status.split(" ", 1)[0]), [
+                (name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers
+            ]))
+
+        iterable = flask_app(environ, start_response)
+        try:
+            for chunk in iterable:
+                if chunk:
+                    put(("body", chunk))
+        finally:
+            if hasattr(iterable, "close"):
+                iterable.close()
+            put(("end", None))
+
+    worker = loop.run_in_executor(wsgi_executor, run)
+    started = False
+    while True:
+        kind, *payload = await queue.get()
+        if kind == "start":
+            status, headers = payload
+            await send({"type": "http.response.start", "status": status, "headers": headers})
+            started = True
+        elif kind == "body":
+            await send({"type": "http.response.body", "body": payload[0], "more_body": True})
+        else:
+            break
+    await worker
+    if started:
+        await send({"type": "http.response.body", "body": b""})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await async_engine.dispose()
+            wsgi_executor.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    match = ROUTE_PATTERN.match(scope["path"]) if scope["method"] == "GET" else None
+    if match:
+        resource, item_id = match.groups()
+        if item_id is None:
+            model, endpoint, not_found_msg = COLLECTION_ROUTES[resource]
+            await handle_read(scope, send, model, endpoint, not_found_msg, None)
+        else:
+            model, endpoint, not_found_msg = ITEM_ROUTES[resource]
+            await handle_read(scope, send, model, endpoint, not_found_msg, int(item_id))
+        return
+    await call_flask(scope, receive, send)
@@ -0,0 +1,163 @@
+"""
+In-process typeahead index for People, Planets and Vehicles names.
+
+Each type keeps a sorted array of (normalized word suffix, id) so a prefix lookup is a
+binary search plus a short scan, without touching the database. It is loaded on first
+use and updated incrementally after each commit; if the table version of the catalogue
+cache moved for another reason (another worker, bulk Core writes) the type is reloaded.
+Other workers and `flask seed` only move that version with a shared cache backend (file,
+redis); with memory each type is instead reloaded once it is older than `max_age` seconds.
+"""
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+from models import People, Planets, Vehicles
+
+AUTOCOMPLETE_MODELS = {model.__tablename__: model for model in (People, Planets, Vehicles)}
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFKD", text or "")
+    return "".join(char for char in text if not unicodedata.combining(char)).casefold().strip()
+
+
+def index_keys(name):
+    # "Luke Skywalker" se encuentra tanto por "luke" como por "sky"
+    words = normalize(name).split()
+    return {" ".join(words[position:]) for position in range(len(words))}
+
+
+class PrefixIndex:
+    def __init__(self, version_source=None, max_age=None):
+        self.version_source = version_source
+        self.max_age = max_age
+        self._entries = {}   # tipo -> [(clave, id)] ordenada
+        self._names = {}     # tipo -> {id: nombre}
+        self._versions = {}  # tipo -> versión de la tabla con la que está sincronizado (None: recargar)
+        self._loaded_at = {}  # tipo -> instante (monotonic) de la última carga completa
+        self._lock = threading.RLock()
+
+    def _current_version(self, entity_type):
+        return self.version_source(entity_type) if self.version_source else 0
+
+    def load(self, session, entity_type):
+        model = AUTOCOMPLETE_MODELS[entity_type]
+        version = self._current_version(entity_type)
+        rows = session.execute(select(model.id, model.name)).all()
+        entries = sorted((key, row.id) for row in rows for key in index_keys(row.name))
+        with self._lock:
+            self._entries[entity_type] = entries
+            self._names[entity_type] = {row.id: row.name for row in rows}
+            self._versions[entity_type] = version
+            self._loaded_at[entity_type] = time.monotonic()
+
+    def ensure_loaded(self, session, entity_type):
+        expired = self.max_age is not None and time.monotonic() - self._loaded_at.get(entity_type, 0) > self.max_age
+        if expired or self._versions.get(entity_type) != self._current_version(entity_type):
+            self.load(session, entity_type)
+
+    def remove(self, entity_type, entity_id):
+        with self._lock:
+            names = self._names.get(entity_type)
+            if names is None or entity_id not in names:
+                return
+            entries = self._entries[entity_type]
+            for key in index_keys(names.pop(entity_id)):
+                position = bisect_left(entries, (key, entity_id))
+                if position < len(entries) and entries[position] == (key, entity_id):
+                    del entries[position]
+
+    def upsert(self, entity_type, entity_id, name):
+        with self._lock:
+            if entity_type not in self._entries:
+                return
+            self.remove(entity_type, entity_id)
+            self._names[entity_type][entity_id] = name
+            for key in index_keys(name):
+                insort(self._entries[entity_type], (key, entity_id))
+
+    def apply(self, updates):
+        with self._lock:
+            for entity_type, entity_id, name in updates:
+                if name is None:
+                    self.remove(entity_type, entity_id)
+                else:
+                    self.upsert(entity_type, entity_id, name)
+            if self.version_source is None:
+                return
+            # El commit propio sube una vez la versión de cada tabla que toca (antes de llegar
+            # aquí). Si la actual es justo la siguiente, el índice está al día; si no, entretanto
+            # escribió otro worker o una sentencia Core y el tipo se recarga en la próxima consulta.
+            for entity_type in {entity_type for entity_type, _, _ in updates}:
+                synced = self._versions.get(entity_type)
+                if synced is None:
+                    continue
+                current = self._current_version(entity_type)
+                self._versions[entity_type] = current if current == synced + 1 else None
+
+    def lookup(self, prefix, types, limit):
+        prefix = normalize(prefix)
+        matches = []
+        with self._lock:
+            for entity_type in types:
+                entries = self._entries.get(entity_type, [])
+                names = self._names.get(entity_type, {})
+                seen = set()
+                position = bisect_left(entries, (prefix,))
+                while position < len(entries) and len(seen) < limit:
+                    key, entity_id = entries[position]
+                    if not key.startswith(prefix):
+                        break
+                    if entity_id not in seen:
+                        seen.add(entity_id)
+                        matches.append((normalize(names[entity_id]), entity_type, entity_id, names[entity_id]))
+                    position += 1
+        matches.sort()
+        return [{"type": entity_type, "id": entity_id, "name": name} for _, entity_type, entity_id, name in matches[:limit]]
+
+    def stats(self):
+        with self._lock:
+            return {entity_type: len(names) for entity_type, names in self._names.items()}
+
+
+autocomplete_index = PrefixIndex()
+
+
+# Los cambios se guardan en la sesión y solo se aplican al índice cuando el commit termina
+
+def _pending(target):
+    session = object_session(target)
+    return session.info.setdefault("autocomplete_updates", []) if session is not None else None
+
+
+def _record_upsert(mapper, connection, target):
+    pending = _pending(target)
+    if pending is not None:
+        pending.append((mapper.local_table.name, target.id, target.name))
+
+
+def _record_delete(mapper, connection, target):
+    pending = _pending(target)
+    if pending is not None:
+        pending.append((mapper.local_table.name, target.id, None))
+
+
+for _model in AUTOCOMPLETE_MODELS.values():
+    event.listen(_model, "after_insert", _record_upsert)
+    event.listen(_model, "after_update", _record_upsert)
+    event.listen(_model, "after_delete", _record_delete)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_updates(session):
+    updates = session.info.pop("autocomplete_updates", None)
+    if updates:
+        autocomplete_index.apply(updates)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_updates(session):
+    session.info.pop("autocomplete_updates", None)
@@ -0,0 +1,349 @@
+"""
+Read-through cache for the catalogue (People, Planets, Vehicles) with pluggable backends.
+
+- memory: LRU per process (default, one copy per gunicorn worker)
+- file:   SQLite file shared by every worker on the same host
+- redis:  any Redis-protocol server (requires the optional `redis` package)
+
+Table versions live in the backend as counters, so a change committed in one
+worker invalidates the entries seen by all the others.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:  # dependencia opcional, solo necesaria con CACHE_BACKEND=redis
+    redis = None
+
+
+class CacheBackend:
+    """Storage interface used by CatalogueCache. Values must be JSON serializable."""
+
+    name = "base"
+    # Si cada operación es E/S (fichero, red): src/asgi.py las saca del bucle de eventos
+    blocking = True
+    # Si todos los workers ven las mismas entradas y contadores
+    shared = True
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value):
+        raise NotImplementedError
+
+    def get_many(self, keys):
+        # [(hit, value), ...] en el orden de keys; los backends remotos lo hacen en un solo viaje
+        return [self.get(key) for key in keys]
+
+    def get_counter(self, name):
+        raise NotImplementedError
+
+    def incr(self, name):
+        raise NotImplementedError
+
+    def set_counter(self, name, value):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def size(self):
+        return None
+
+    def stats(self):
+        return {
+            "backend": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "size": self.size(),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+        }
+
+
+class MemoryBackend(CacheBackend):
+    """LRU cache with a per-entry TTL, local to the process."""
+
+    name = "memory"
+    blocking = False
+    shared = False
+
+    def __init__(self, max_entries=1024, ttl=300):
+        super().__init__(max_entries, ttl)
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_counter(self, name):
+        return self._counters.get(name, 0)
+
+    def incr(self, name):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+            return self._counters[name]
+
+    def set_counter(self, name, value):
+        with self._lock:
+            self._counters[name] = value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        return len(self._entries)
+
+
+class FileBackend(CacheBackend):
+    """Cache stored in a local SQLite file, shared by all the workers of the host."""
+
+    name = "file"
+
+    # Cada cuántas escrituras se purgan las entradas caducadas y las sobrantes
+    PURGE_EVERY = 256
+
+    def __init__(self, path, max_entries=1024, ttl=300):
+        super().__init__(max_entries, ttl)
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_entries_expires_at ON cache_entries (expires_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute("SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return False, None
+        if row[1] < time.time():
+            self.expirations += 1
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, json.loads(row[0])
+
+    def set(self, key, value):
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time() + self.ttl),
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self._purge(conn)
+
+    def _purge(self, conn):
+        expired = conn.execute("DELETE FROM cache_entries WHERE expires_at < ?", (time.time(),)).rowcount
+        self.expirations += max(expired, 0)
+        # Si sigue lleno se descartan las entradas que caducan antes (las más antiguas)
+        overflow = conn.execute(
+            "DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_entries ORDER BY expires_at "
+            "LIMIT max((SELECT count(*) FROM cache_entries) - ?, 0))",
+            (self.max_entries,),
+        ).rowcount
+        self.evictions += max(overflow, 0)
+
+    def get_counter(self, name):
+        row = self._connect().execute("SELECT value FROM cache_counters WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def incr(self, name):
+        conn = self._connect()
+        conn.execute(
+            "INSERT INTO cache_counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+        return self.get_counter(name)
+
+    def set_counter(self, name, value):
+        self._connect().execute("INSERT OR REPLACE INTO cache_counters (name, value) VALUES (?, ?)", (name, value))
+
+    def clear(self):
+        self._connect().execute("DELETE FROM cache_entries")
+
+    def size(self):
+        return self._connect().execute("SELECT count(*) FROM cache_entries").fetchone()[0]
+
+
+class RedisBackend(CacheBackend):
+    """Cache stored in a Redis-protocol server shared by every worker and host."""
+
+    name = "redis"
+
+    def __init__(self, url, max_entries=1024, ttl=300, prefix="starwars:"):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        super().__init__(max_entries, ttl)
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, json.loads(raw)
+
+    def set(self, key, value):
+        # La expulsión por memoria la gestiona el propio servidor (maxmemory-policy)
+        self.client.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+
+    def get_many(self, keys):
+        entries = []
+        for raw in self.client.mget([self.prefix + key for key in keys]):
+            if raw is None:
+                self.misses += 1
+                entries.append((False, None))
+            else:
+                self.hits += 1
+                entries.append((True, json.loads(raw)))
+        return entries
+
+    def get_counter(self, name):
+        raw = self.client.get(self.prefix + "counter:" + name)
+        return int(raw) if raw is not None else 0
+
+    def incr(self, name):
+        return self.client.incr(self.prefix + "counter:" + name)
+
+    def set_counter(self, name, value):
+        self.client.set(self.prefix + "counter:" + name, value)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + "entry:*"):
+            self.client.delete(key)
+
+
+def create_backend(name="memory", url=None, max_entries=1024, ttl=300):
+    if name == "memory":
+        return MemoryBackend(max_entries, ttl)
+    if name == "file":
+        return FileBackend(url or os.path.join("/tmp", "starwars-api-cache.db"), max_entries, ttl)
+    if name == "redis":
+        return RedisBackend(url or "redis://localhost:6379/0", max_entries, ttl)
+    raise ValueError(f"Unknown cache backend: {name}")
+
+
+class CatalogueCache:
+    """Caches serialized rows and pages per table; a change bumps the table version."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def epoch(self):
+        # Identifica la "vida" de los contadores: si el backend se vacía (reinicio
+        # del proceso o de Redis) cambia, y con él todos los ETag emitidos
+        epoch = self.backend.get_counter("epoch")
+        if not epoch:
+            epoch = int(time.time())
+            self.backend.set_counter("epoch", epoch)
+        return epoch
+
+    def version(self, namespace):
+        return self.backend.get_counter("version:" + namespace)
+
+    def last_modified(self, namespace):
+        return self.backend.get_counter("modified:" + namespace) or self.epoch()
+
+    def invalidate(self, namespace):
+        # Las claves llevan la versión de la tabla: al subirla, las entradas viejas
+        # dejan de ser alcanzables en todos los workers y acaban expulsadas o caducadas
+        version = self.backend.incr("version:" + namespace)
+        # Last-Modified tiene resolución de segundos y nunca retrocede
+        modified = max(int(time.time()), self.last_modified(namespace))
+        self.backend.set_counter("modified:" + namespace, modified)
+        return version
+
+    def make_key(self, namespace, key, version=None):
+        version = self.version(namespace) if version is None else version
+        return "entry:{}:{}:{}".format(namespace, version, json.dumps(list(key), separators=(",", ":")))
+
+    def get_or_set(self, namespace, key, loader):
+        full_key = self.make_key(namespace, key)
+        hit, value = self.backend.get(full_key)
+        if hit:
+            return value
+        value = loader()
+        # No se guardan los "no encontrado" para no ocultar altas posteriores
+        if value is not None:
+            self.backend.set(full_key, value)
+        return value
+
+    def get_or_set_many(self, namespace, keys, loader):
+        """Values for every key, in order. The missing ones are loaded with a single
+        loader(missing_keys) call, which returns their values in the same order."""
+        version = self.version(namespace)
+        full_keys = [self.make_key(namespace, key, version) for key in keys]
+        entries = self.backend.get_many(full_keys)
+        values = [value for _, value in entries]
+        missing = [position for position, (hit, _) in enumerate(entries) if not hit]
+        if missing:
+            for position, value in zip(missing, loader([keys[position] for position in missing])):
+                values[position] = value
+                # Igual que get_or_set: los "no encontrado" no se guardan
+                if value is not None:
+                    self.backend.set(full_keys[position], value)
+        return values
+
+    def handle_changes(self, changes):
+        for tablename in {tablename for tablename, _ in changes}:
+            self.invalidate(tablename)
+
+    def stats(self):
+        stats = self.backend.stats()
+        stats["versions"] = {
+            namespace: self.version(namespace)
+            for namespace in ("people", "planets", "vehicles", "users", "favorites")
+        }
+        return stats
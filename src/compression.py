@@ -0,0 +1,180 @@
+"""
+Negotiated response compression (zstd, brotli, gzip) for bodies above a size threshold.
+
+Cacheable responses (the @conditional views) keep their compressed body in memory keyed
+by their ETag, which already encodes the table versions, so a repeated request is
+answered without running the view, serializing or compressing again.
+brotli and zstandard are optional; without them only gzip is offered.
+"""
+import gzip
+import threading
+from collections import OrderedDict
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # dependencia opcional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # dependencia opcional
+    zstandard = None
+
+# Orden de preferencia del servidor cuando el cliente acepta varias con la misma q
+ENCODINGS = ("zstd", "br", "gzip")
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json", "application/x-ndjson", "application/javascript", "application/xml",
+    "text/html", "text/plain", "text/css", "text/csv", "text/xml",
+}
+
+
+def available_encodings():
+    installed = {"zstd": zstandard is not None, "br": brotli is not None, "gzip": True}
+    return tuple(encoding for encoding in ENCODINGS if installed[encoding])
+
+
+def compress(body, encoding):
+    # Niveles medios: casi toda la reducción de tamaño con poco coste de CPU
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6, mtime=0)
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def parse_accept_encoding(header):
+    """{"gzip": 1.0, "br": 0.8, "*": 0.1} from an Accept-Encoding header."""
+    accepted = {}
+    for item in (header or "").split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+def negotiate(header, encodings):
+    accepted = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressedBodies:
+    """LRU of (mimetype, compressed body) limited by the total size in bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, mimetype, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous[1])
+            self._entries[key] = (mimetype, body)
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "hits": self.hits, "misses": self.misses}
+
+
+class Compressor:
+    def __init__(self, encodings, min_size=1024, cache_bytes=32 * 2 ** 20):
+        self.encodings = tuple(encodings)
+        self.min_size = min_size
+        self.bodies = CompressedBodies(cache_bytes)
+
+    def choose(self, accept_encoding):
+        return negotiate(accept_encoding, self.encodings) if self.encodings else None
+
+    def should_compress(self, response):
+        return (
+            not response.direct_passthrough
+            and not response.is_streamed
+            and 200 <= response.status_code < 300
+            and response.status_code != 204
+            and "Content-Encoding" not in response.headers
+            and response.mimetype in COMPRESSIBLE_MIMETYPES
+            and (response.content_length or 0) >= self.min_size
+        )
+
+    def compress_response(self, response, encoding, cache_key=None):
+        """Compresses the body in place if it is worth it; with `cache_key` the
+        compressed body is kept for the next request with the same key."""
+        if not self.should_compress(response):
+            return response
+        body = compress(response.get_data(), encoding)
+        if cache_key is not None:
+            self.bodies.set(cache_key, response.mimetype, body)
+        return self.encoded_response(response, body, encoding)
+
+    @staticmethod
+    def encoded_response(response, body, encoding):
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        return response
+
+
+def init_app(app):
+    """Compresses every eligible response that was not already compressed by @conditional.
+
+    COMPRESS_ALGORITHMS (comma separated, empty disables compression), COMPRESS_MIN_SIZE
+    (bytes) and COMPRESS_CACHE_BYTES (memory for precompressed bodies, per process)."""
+    app.config.setdefault("COMPRESS_ALGORITHMS", ",".join(available_encodings()))
+    app.config.setdefault("COMPRESS_MIN_SIZE", 1024)
+    app.config.setdefault("COMPRESS_CACHE_BYTES", 32 * 2 ** 20)
+
+    configured = [name.strip() for name in app.config["COMPRESS_ALGORITHMS"].split(",") if name.strip()]
+    compressor = Compressor(
+        [encoding for encoding in available_encodings() if encoding in configured],
+        min_size=app.config["COMPRESS_MIN_SIZE"],
+        cache_bytes=app.config["COMPRESS_CACHE_BYTES"],
+    )
+    app.extensions["compression"] = compressor
+
+    @app.after_request
+    def _compress_response(response):
+        encoding = compressor.choose(request.headers.get("Accept-Encoding"))
+        if encoding is not None:
+            compressor.compress_response(response, encoding)
+        return response
+
+    return compressor
@@ -0,0 +1,117 @@
+"""
+HTTP conditional requests (ETag / Last-Modified / 304) driven by the table versions
+kept by the catalogue cache, so revalidating never touches the database.
+
+Only with a cache backend shared by every worker (file, redis): with memory each process
+keeps its own versions, so a worker that did not see a write would keep answering 304.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+from flask import current_app, request, make_response
+
+# Cabecera por defecto: el cliente puede guardar la respuesta pero debe revalidarla
+DEFAULT_CACHE_CONTROL = "no-cache"
+
+
+def validators_enabled(cache):
+    # Con versiones por proceso un ETag no dice si la tabla cambió en otro worker
+    return cache.backend.shared
+
+
+def compute_validators(cache, namespaces, path, args):
+    versions = [cache.version(namespace) for namespace in namespaces]
+    seed = "{}|{}|{}|{}".format(
+        cache.epoch(),
+        ",".join(f"{namespace}={version}" for namespace, version in zip(namespaces, versions)),
+        path,
+        "&".join(sorted(f"{key}={value}" for key, value in args.items(multi=True))),
+    )
+    etag = hashlib.sha1(seed.encode()).hexdigest()
+    last_modified = datetime.fromtimestamp(max(cache.last_modified(namespace) for namespace in namespaces), tz=timezone.utc)
+    return etag, last_modified
+
+
+def is_not_modified(etag, last_modified, if_none_match, if_modified_since):
+    # If-None-Match tiene prioridad; If-Modified-Since solo se mira si no viene ETag
+    if if_none_match:
+        return if_none_match.contains(etag)
+    if if_modified_since:
+        # Una fecha del segundo en curso no es fiable: puede haber más cambios en ese segundo
+        if last_modified.timestamp() >= int(time.time()):
+            return False
+        return last_modified <= if_modified_since
+    return False
+
+
+def representation_etags(etag, encoding):
+    # Solo un cuerpo comprimido lleva el sufijo de la codificación: uno menor que
+    # COMPRESS_MIN_SIZE se envía tal cual con el ETag base, sin duplicar variantes en las cachés
+    return (f"{etag}-{encoding}", etag) if encoding else (etag,)
+
+
+def not_modified_etag(etags, last_modified, if_none_match, if_modified_since):
+    """The ETag of the still valid client copy among `etags`, or None if it changed."""
+    for etag in etags:
+        if is_not_modified(etag, last_modified, if_none_match, if_modified_since):
+            return etag
+    return None
+
+
+def conditional(*namespaces, cache_control=DEFAULT_CACHE_CONTROL):
+    """Adds ETag, Last-Modified and Cache-Control to a GET view and answers 304 when
+    the client copy is still valid. `namespaces` are the tables the response depends on.
+    app.config['CACHE_CONTROL'] can override the header per endpoint name.
+
+    With compression enabled each encoding gets its own ETag (only when the body is actually
+    compressed) and the compressed body is reused until the ETag changes, without calling
+    the view again. Without a shared cache
+    backend the view always runs and only Cache-Control is added."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = current_app.extensions["catalogue_cache"]
+            header = current_app.config.get("CACHE_CONTROL", {}).get(request.endpoint, cache_control)
+            compressor = current_app.extensions.get("compression")
+            if not validators_enabled(cache):
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200:
+                    response.headers["Cache-Control"] = header
+                    if compressor:
+                        response.vary.add("Accept-Encoding")
+                return response
+
+            etag, last_modified = compute_validators(cache, namespaces, request.path, request.args)
+            encoding = compressor.choose(request.headers.get("Accept-Encoding")) if compressor else None
+            etags = representation_etags(etag, encoding)
+
+            matched = not_modified_etag(etags, last_modified, request.if_none_match, request.if_modified_since)
+            if matched:
+                response, etag = make_response("", 304), matched
+            else:
+                cached = compressor.bodies.get(etags[0]) if encoding else None
+                if cached is not None:
+                    mimetype, body = cached
+                    response = compressor.encoded_response(current_app.response_class(mimetype=mimetype), body, encoding)
+                    etag = etags[0]
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    if encoding:
+                        compressor.compress_response(response, encoding, cache_key=etags[0])
+                        if "Content-Encoding" in response.headers:
+                            etag = etags[0]
+
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.headers["Cache-Control"] = header
+            if compressor:
+                response.vary.add("Accept-Encoding")
+            return response
+
+        return wrapper
+
+    return decorator
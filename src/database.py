@@ -0,0 +1,250 @@
+"""
+Engine and connection pool configuration read from the environment, pool metrics
+(checkouts, overflow, time spent waiting for a connection) and read replica routing.
+"""
+import itertools
+import os
+import threading
+import time
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.util import find_tables
+
+
+class PoolMetrics:
+    """Counters per pool, keyed by the pool logging name (one per engine)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools = {}
+
+    def _counters(self, name):
+        return self._pools.setdefault(name, {
+            "connects": 0,
+            "checkouts": 0,
+            "checkins": 0,
+            "invalidations": 0,
+            "timeouts": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+        })
+
+    def incr(self, name, counter):
+        with self._lock:
+            self._counters(name)[counter] += 1
+
+    def record_wait(self, name, seconds):
+        with self._lock:
+            counters = self._counters(name)
+            counters["wait_time_total"] += seconds
+            counters["wait_time_max"] = max(counters["wait_time_max"], seconds)
+
+    def snapshot(self, name):
+        with self._lock:
+            counters = dict(self._counters(name))
+        if counters["checkouts"]:
+            counters["wait_time_avg"] = counters["wait_time_total"] / counters["checkouts"]
+        return counters
+
+
+pool_metrics = PoolMetrics()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that measures how long each checkout waits for a free connection."""
+
+    def _do_get(self):
+        name = self._orig_logging_name or "primary"
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.incr(name, "timeouts")
+            raise
+        finally:
+            pool_metrics.record_wait(name, time.perf_counter() - started)
+
+
+def _env_int(environ, name, default):
+    value = environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+def engine_options_from_env(database_uri, name="primary", environ=os.environ):
+    """SQLALCHEMY_ENGINE_OPTIONS built from DB_POOL_* / DB_STATEMENT_TIMEOUT_MS."""
+    options = {
+        "pool_pre_ping": environ.get("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes"),
+        "pool_recycle": _env_int(environ, "DB_POOL_RECYCLE", 1800),
+        "pool_logging_name": name,
+    }
+    # SQLite en memoria usa un pool de un solo hilo que no admite estas opciones
+    if not (database_uri.startswith("sqlite") and ":memory:" in database_uri):
+        options.update({
+            "poolclass": TimedQueuePool,
+            "pool_size": _env_int(environ, "DB_POOL_SIZE", 5),
+            "max_overflow": _env_int(environ, "DB_MAX_OVERFLOW", 10),
+            "pool_timeout": _env_int(environ, "DB_POOL_TIMEOUT", 30),
+        })
+
+    statement_timeout = _env_int(environ, "DB_STATEMENT_TIMEOUT_MS", 0)
+    if statement_timeout and database_uri.startswith("postgresql"):
+        options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout}"}
+    elif statement_timeout and database_uri.startswith("mysql"):
+        options["connect_args"] = {"init_command": f"SET SESSION max_execution_time={statement_timeout}"}
+    return options
+
+
+def connect_timeout_args(database_uri, seconds):
+    # Tiempo máximo para abrir una conexión (libpq y los drivers de MySQL lo llaman igual)
+    if seconds and database_uri.startswith(("postgresql", "mysql")):
+        return {"connect_timeout": seconds}
+    return {}
+
+
+def instrument_engine(engine):
+    name = engine.pool._orig_logging_name or "primary"
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        pool_metrics.incr(name, "connects")
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_metrics.incr(name, "checkouts")
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        pool_metrics.incr(name, "checkins")
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        pool_metrics.incr(name, "invalidations")
+
+
+def pool_stats(engine):
+    pool = engine.pool
+    name = pool._orig_logging_name or "primary"
+    # Sin la URL: /pool/stats es público y no debe revelar driver, host, usuario ni base de datos
+    stats = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        })
+    stats.update(pool_metrics.snapshot(name))
+    return stats
+
+
+class ReplicaRouter:
+    """Round-robin over the replica engines, skipping the ones that fail a health check.
+
+    Health checks run every `health_interval` seconds in a background thread, so a replica
+    that does not answer never holds up a request; until its first check succeeds a
+    replica is not used. New replica connections give up after `connect_timeout` seconds.
+
+    `last_modified` returns the time (epoch seconds) of the last write to a table; reads
+    touching a table written less than `sticky_seconds` ago go to the primary, so whoever
+    wrote (and the caches) never sees a replica that has not caught up yet. It must come
+    from a store shared by every worker, which app.py enforces."""
+
+    def __init__(self, urls, last_modified=None, sticky_seconds=5, health_interval=10, connect_timeout=3):
+        self.engines = []
+        for position, url in enumerate(urls):
+            options = engine_options_from_env(url, name=f"replica{position}")
+            options["connect_args"] = dict(options.get("connect_args", {}), **connect_timeout_args(url, connect_timeout))
+            engine = create_engine(url, **options)
+            instrument_engine(engine)
+            self.engines.append(engine)
+        self.last_modified = last_modified
+        self.sticky_seconds = sticky_seconds
+        self.health_interval = health_interval
+        self._cycle = itertools.cycle(range(len(self.engines)))
+        self._checked_at = {}
+        self._healthy = {}
+        self._probing = set()  # comprobaciones en curso, como mucho una por réplica
+        self._lock = threading.Lock()
+        self.primary_reads = 0
+        self.replica_reads = 0
+
+    def _probe(self, position):
+        try:
+            with self.engines[position].connect() as connection:
+                connection.execute(text("SELECT 1"))
+            healthy = True
+        except Exception:
+            healthy = False
+        with self._lock:
+            self._healthy[position] = healthy
+            self._probing.discard(position)
+
+    def choose(self):
+        # None = ninguna réplica disponible, se usa la primaria
+        now = time.monotonic()
+        chosen, due = None, []
+        with self._lock:
+            # Bajo el lock solo se reparten los turnos y se reservan las comprobaciones pendientes
+            for position in range(len(self.engines)):
+                if position in self._probing:
+                    continue
+                if now - self._checked_at.get(position, float("-inf")) >= self.health_interval:
+                    self._checked_at[position] = now
+                    self._probing.add(position)
+                    due.append(position)
+            for _ in range(len(self.engines)):
+                position = next(self._cycle)
+                if self._healthy.get(position):
+                    chosen = self.engines[position]
+                    break
+        # La conexión de prueba se hace en otro hilo: una réplica que no responde no bloquea la petición
+        for position in due:
+            threading.Thread(target=self._probe, args=(position,), daemon=True).start()
+        return chosen
+
+    def recently_written(self, tablenames):
+        if self.last_modified is None:
+            return False
+        # last_modified está truncado a segundos: se cuenta el segundo completo
+        threshold = time.time() - self.sticky_seconds
+        return any(self.last_modified(name) + 1 > threshold for name in tablenames)
+
+    def stats(self):
+        return {
+            "replicas": [
+                {"name": f"replica{position}", "healthy": self._healthy.get(position)}
+                for position in range(len(self.engines))
+            ],
+            "primary_reads": self.primary_reads,
+            "replica_reads": self.replica_reads,
+        }
+
+
+class RoutingSession(FlaskSession):
+    """Session that sends reads to a replica when the request enabled it (GET/HEAD).
+
+    Flushes, explicit binds and statements on recently written tables use the primary."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        router = self.info.get("replica_router")
+        if router is not None and bind is None and not self._flushing:
+            tables = set()
+            if mapper is not None:
+                tables.add(mapper.local_table.name)
+            if clause is not None:
+                tables.update(getattr(table, "name", None) for table in find_tables(clause, include_joins=True))
+            tables.discard(None)
+            if not router.recently_written(tables):
+                # Toda la petición usa la misma réplica para leer
+                if "replica_engine" not in self.info:
+                    self.info["replica_engine"] = router.choose()
+                engine = self.info["replica_engine"]
+                if engine is not None:
+                    router.replica_reads += 1
+                    return engine
+            router.primary_reads += 1
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
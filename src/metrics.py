@@ -0,0 +1,218 @@
+"""
+Per-request instrumentation: latency, number of SQL statements and time spent in the
+database, response size and JSON serialization time, aggregated per endpoint and
+exposed in the Prometheus text format. Metrics are kept per process.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import Response, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Estadísticas de la petición en curso (None fuera de una petición)
+current_request = ContextVar("current_request", default=None)
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time", "serialize_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join('{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+                     for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # etiquetas -> [contadores por bucket..., suma, total]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[position] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ("le",)
+        with self._lock:
+            for label_values, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_format_labels(names, label_values + (bound,))} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(names, label_values + ('+Inf',))} {series[-1]}")
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+                lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+ROUTE_LABELS = ("method", "endpoint", "status")
+request_duration = registry.histogram(
+    "http_request_duration_seconds", "Time spent handling the request.", ROUTE_LABELS)
+request_queries = registry.histogram(
+    "http_request_sql_queries", "SQL statements executed per request.", ROUTE_LABELS, QUERY_BUCKETS)
+request_db_duration = registry.histogram(
+    "http_request_db_duration_seconds", "Time spent in SQL statements per request.", ROUTE_LABELS)
+response_size = registry.histogram(
+    "http_response_size_bytes", "Size of the response body (streamed responses excluded).", ROUTE_LABELS, SIZE_BUCKETS)
+serialization_duration = registry.histogram(
+    "http_response_serialization_seconds", "Time spent encoding the JSON body.", ROUTE_LABELS)
+n_plus_one_requests = registry.counter(
+    "http_requests_query_threshold_exceeded_total",
+    "Requests that ran more SQL statements than METRICS_QUERY_THRESHOLD (likely N+1).",
+    ("method", "endpoint"))
+
+
+# Tiempos de cada sentencia SQL de cualquier engine (principal, réplicas, async)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_request.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request.get()
+    started = conn.info.get("query_started")
+    if stats is not None and started:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - started.pop()
+
+
+@contextmanager
+def serialization_timer():
+    stats = current_request.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.serialize_time += time.perf_counter() - started
+
+
+def server_timing(total, stats):
+    return ", ".join((
+        f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries"',
+        f"serialize;dur={stats.serialize_time * 1000:.2f}",
+        f"total;dur={total * 1000:.2f}",
+    ))
+
+
+def init_app(app):
+    """Registers the request hooks and the /metrics endpoint.
+
+    app.config['METRICS_QUERY_THRESHOLD'] is the number of SQL statements above which a
+    request is logged and counted as a likely N+1."""
+    app.config.setdefault("METRICS_QUERY_THRESHOLD", 20)
+
+    @app.before_request
+    def _start_request_metrics():
+        g.request_started = time.perf_counter()
+        g.request_stats = RequestStats()
+        g.request_stats_token = current_request.set(g.request_stats)
+
+    @app.after_request
+    def _record_request_metrics(response):
+        stats = g.get("request_stats")
+        if stats is None:
+            return response
+        total = time.perf_counter() - g.request_started
+        labels = (request.method, request.endpoint or "unmatched", str(response.status_code))
+        request_duration.observe(total, *labels)
+        request_queries.observe(stats.queries, *labels)
+        request_db_duration.observe(stats.db_time, *labels)
+        serialization_duration.observe(stats.serialize_time, *labels)
+        if not response.is_streamed:
+            response_size.observe(response.calculate_content_length() or 0, *labels)
+        response.headers["Server-Timing"] = server_timing(total, stats)
+
+        threshold = app.config["METRICS_QUERY_THRESHOLD"]
+        if threshold and stats.queries > threshold:
+            n_plus_one_requests.inc(request.method, labels[1])
+            app.logger.warning(
+                "%s %s ran %d SQL statements (threshold %d): likely N+1",
+                request.method, request.full_path.rstrip("?"), stats.queries, threshold,
+            )
+        return response
+
+    @app.teardown_request
+    def _finish_request_metrics(exception=None):
+        token = g.pop("request_stats_token", None)
+        if token is not None:
+            current_request.reset(token)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
@@ -1,16 +1,94 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import bindparam, event, func, insert, inspect, select, update, SmallInteger
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, object_session
+from database import RoutingSession
 
-db = SQLAlchemy()
+# La sesión puede enviar las lecturas a una réplica (ver DATABASE_REPLICA_URLS en app.py)
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+# Funciones a las que se avisa, tras cada commit, de las filas que han cambiado
+change_listeners = []
+
+def on_change(listener):
+    change_listeners.append(listener)
+    return listener
+
+def mark_changed(session, tablename, entity_id=None):
+    # entity_id=None indica un cambio masivo sobre la tabla.
+    # Las sentencias Core (insert/delete) no disparan los eventos de mapper y deben llamarla.
+    session.info.setdefault("changed_rows", set()).add((tablename, entity_id))
+
+# Valores que en los datos de SWAPI significan "sin dato"
+UNKNOWN_VALUES = {"", "unknown", "n/a", "none", "indefinite"}
+
+def parse_number(value):
+    # "1,000,000" -> 1000000.0; "unknown"/"n/a" u otros textos -> None
+    if value is None:
+        return None
+    text = str(value).strip().lower().replace(",", "")
+    if text in UNKNOWN_VALUES:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+def fill_numeric_columns(model, values):
+    # Rellena las columnas numéricas "sombra" a partir de las de texto (para inserts Core)
+    for field, column in model.numeric_fields.items():
+        if field in values:
+            values[column] = parse_number(values[field])
+    return values
+
+def insert_ignore_duplicates(model, dialect_name):
+    # INSERT que no falla si choca con un índice único (ON CONFLICT DO NOTHING / INSERT IGNORE)
+    if dialect_name == "postgresql":
+        return postgresql.insert(model).on_conflict_do_nothing()
+    if dialect_name == "sqlite":
+        return sqlite.insert(model).on_conflict_do_nothing()
+    if dialect_name in ("mysql", "mariadb"):
+        return insert(model).prefix_with("IGNORE")
+    return insert(model)
+
+# Registro de tipos de favorito (se rellena al final con register_favorite_type)
+FAVORITE_TYPE_CODES = {}    # nombre -> código guardado en favorites.favorite_type
+FAVORITE_TYPE_BY_CODE = {}  # código -> nombre
+FAVORITE_MODELS = {}        # nombre o alias ("planets") -> modelo
+FAVORITE_TYPE_NAMES = {}    # modelo -> nombre
+
+class FavoriteType(TypeDecorator):
+    """Favorite type stored as a SMALLINT code; Python code and the API see the name."""
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or value in FAVORITE_TYPE_BY_CODE:
+            return value
+        model = FAVORITE_MODELS.get(value)
+        if model is None:
+            raise ValueError(f"Unknown favorite type: {value!r}")
+        return FAVORITE_TYPE_CODES[FAVORITE_TYPE_NAMES[model]]
+
+    def process_result_value(self, value, dialect):
+        return FAVORITE_TYPE_BY_CODE.get(value, value)
 
 class Favorites(db.Model):
     __tablename__ = 'favorites'
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     favorite_id = db.Column(db.Integer, nullable=False)  # ID del favorito
-    favorite_type = db.Column(db.String(50), nullable=False)  # Tipo (e.g., "people", "planets", "vehicles")
+    favorite_type = db.Column(FavoriteType, nullable=False)  # Tipo: "people", "planet" o "vehicle" (ver register_favorite_type)
     extra_info = db.Column(db.Text)
 
     user = db.relationship('Users', backref='favorites')
+
+    # Todas las búsquedas y borrados filtran por estas tres columnas; además evita duplicados
+    __table_args__ = (
+        db.Index('ix_favorites_user_type_favorite', 'user_id', 'favorite_type', 'favorite_id', unique=True),
+    )
     
     def __repr__(self):
         return f'<Favorites {self.id}>'
@@ -52,6 +130,22 @@ class People(db.Model):
     birth_year = db.Column(db.String(100), nullable=False)
     gender = db.Column(db.String(100), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    # Copias numéricas de height y mass para filtrar y ordenar en la base de datos
+    height_num = db.Column(db.Float, nullable=True)
+    mass_num = db.Column(db.Float, nullable=True)
+    # Número de usuarios que lo tienen como favorito (mantenido al añadir/quitar favoritos)
+    favorite_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    # Campo de texto -> columna numérica; campos filtrables por igualdad (indexados)
+    numeric_fields = {"height": "height_num", "mass": "mass_num"}
+    filter_fields = ("gender",)
+
+    __table_args__ = (
+        db.Index('ix_people_height_num', 'height_num', 'id'),
+        db.Index('ix_people_mass_num', 'mass_num', 'id'),
+        db.Index('ix_people_gender', 'gender', 'id'),
+        db.Index('ix_people_favorite_count', 'favorite_count', 'id'),
+    )
 
     def __repr__(self):
         return f'<People {self.name}>'
@@ -82,6 +176,23 @@ class Planets(db.Model):
     rotation_period = db.Column(db.String(50), nullable=False)
     surface_water = db.Column(db.String(50), nullable=False)
     terrain = db.Column(db.String(50), nullable=False)
+    diameter_num = db.Column(db.Float, nullable=True)
+    population_num = db.Column(db.Float, nullable=True)
+    orbital_period_num = db.Column(db.Float, nullable=True)
+    # Número de usuarios que lo tienen como favorito (mantenido al añadir/quitar favoritos)
+    favorite_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    numeric_fields = {"diameter": "diameter_num", "population": "population_num", "orbital_period": "orbital_period_num"}
+    filter_fields = ("climate", "terrain")
+
+    __table_args__ = (
+        db.Index('ix_planets_diameter_num', 'diameter_num', 'id'),
+        db.Index('ix_planets_population_num', 'population_num', 'id'),
+        db.Index('ix_planets_orbital_period_num', 'orbital_period_num', 'id'),
+        db.Index('ix_planets_climate', 'climate', 'id'),
+        db.Index('ix_planets_terrain', 'terrain', 'id'),
+        db.Index('ix_planets_favorite_count', 'favorite_count', 'id'),
+    )
 
     def __repr__(self):
         return f'<Planets {self.name}>'
@@ -114,6 +225,23 @@ class Vehicles(db.Model):
     model = db.Column(db.String(100), nullable=False)
     passengers = db.Column(db.String(100), nullable=False)
     vehicle_class = db.Column(db.String(100), nullable=False)
+    cost_in_credits_num = db.Column(db.Float, nullable=True)
+    crew_num = db.Column(db.Float, nullable=True)
+    length_num = db.Column(db.Float, nullable=True)
+    # Número de usuarios que lo tienen como favorito (mantenido al añadir/quitar favoritos)
+    favorite_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    numeric_fields = {"cost_in_credits": "cost_in_credits_num", "crew": "crew_num", "length": "length_num"}
+    filter_fields = ("vehicle_class", "manufacturer")
+
+    __table_args__ = (
+        db.Index('ix_vehicles_cost_in_credits_num', 'cost_in_credits_num', 'id'),
+        db.Index('ix_vehicles_crew_num', 'crew_num', 'id'),
+        db.Index('ix_vehicles_length_num', 'length_num', 'id'),
+        db.Index('ix_vehicles_vehicle_class', 'vehicle_class', 'id'),
+        db.Index('ix_vehicles_manufacturer', 'manufacturer', 'id'),
+        db.Index('ix_vehicles_favorite_count', 'favorite_count', 'id'),
+    )
 
     def __repr__(self):
         return f'<Vehicles {self.name}>'
@@ -133,3 +261,100 @@ class Vehicles(db.Model):
             "passengers": self.passengers,
             "vehicle_class": self.vehicle_class,
         }
+
+
+def register_favorite_type(code, name, model, aliases=()):
+    # Un tipo nuevo solo necesita una línea aquí: las rutas /favorites/<tipo>/<id>,
+    # el batch y el ?expand=true de los favoritos salen de este registro.
+    # El código se guarda en la base de datos: no se puede reutilizar ni cambiar.
+    FAVORITE_TYPE_CODES[name] = code
+    FAVORITE_TYPE_BY_CODE[code] = name
+    FAVORITE_TYPE_NAMES[model] = name
+    for alias in (name, *aliases):
+        FAVORITE_MODELS[alias] = model
+
+register_favorite_type(1, "people", People)
+register_favorite_type(2, "planet", Planets, aliases=("planets",))
+register_favorite_type(3, "vehicle", Vehicles, aliases=("vehicles",))
+
+def adjust_favorite_counts(executor, model, ids, delta):
+    # Suma delta a favorite_count de las entidades indicadas, en la transacción en curso.
+    # Las sentencias Core sobre favorites deben llamarla; las del ORM lo hacen solas (eventos).
+    if model is not None and ids:
+        table = model.__table__
+        executor.execute(
+            update(table).where(table.c.id.in_(ids)).values(favorite_count=table.c.favorite_count + delta)
+        )
+
+def recount_favorites(executor):
+    # Recalcula todos los contadores desde la tabla favorites (tras cargas masivas o para corregir).
+    # Un GROUP BY por tipo y un UPDATE por lotes: una subconsulta correlacionada recorrería
+    # favorites una vez por fila, ya que no hay índice por (favorite_type, favorite_id)
+    favorites = Favorites.__table__
+    for model, name in FAVORITE_TYPE_NAMES.items():
+        table = model.__table__
+        executor.execute(update(table).where(table.c.favorite_count != 0).values(favorite_count=0))
+        counts = executor.execute(
+            select(favorites.c.favorite_id, func.count())
+            .where(favorites.c.favorite_type == name)
+            .group_by(favorites.c.favorite_id)
+        ).all()
+        if counts:
+            executor.execute(
+                update(table).where(table.c.id == bindparam("entity_id")).values(favorite_count=bindparam("total")),
+                [{"entity_id": entity_id, "total": total} for entity_id, total in counts],
+            )
+
+def _count_favorite_insert(mapper, connection, target):
+    adjust_favorite_counts(connection, FAVORITE_MODELS.get(target.favorite_type), [target.favorite_id], 1)
+
+def _count_favorite_delete(mapper, connection, target):
+    adjust_favorite_counts(connection, FAVORITE_MODELS.get(target.favorite_type), [target.favorite_id], -1)
+
+def _count_favorite_update(mapper, connection, target):
+    # Si cambia el destino del favorito (p. ej. desde el admin) se mueve el contador.
+    # Tras un commit los valores anteriores están expirados: se leen de la fila antes del UPDATE
+    state = inspect(target)
+    if not (state.attrs.favorite_type.history.has_changes() or state.attrs.favorite_id.history.has_changes()):
+        return
+    table = Favorites.__table__
+    old = connection.execute(
+        select(table.c.favorite_type, table.c.favorite_id).where(table.c.id == target.id)
+    ).first()
+    if old is None or (old.favorite_type, old.favorite_id) == (target.favorite_type, target.favorite_id):
+        return
+    adjust_favorite_counts(connection, FAVORITE_MODELS.get(old.favorite_type), [old.favorite_id], -1)
+    adjust_favorite_counts(connection, FAVORITE_MODELS.get(target.favorite_type), [target.favorite_id], 1)
+
+event.listen(Favorites, "after_insert", _count_favorite_insert)
+event.listen(Favorites, "after_delete", _count_favorite_delete)
+event.listen(Favorites, "before_update", _count_favorite_update)
+
+def _sync_numeric_columns(mapper, connection, target):
+    for field, column in type(target).numeric_fields.items():
+        setattr(target, column, parse_number(getattr(target, field)))
+
+for _model in (People, Planets, Vehicles):
+    event.listen(_model, "before_insert", _sync_numeric_columns)
+    event.listen(_model, "before_update", _sync_numeric_columns)
+
+def _track_change(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        mark_changed(session, mapper.local_table.name, target.id)
+
+for _model in (Favorites, Users, People, Planets, Vehicles):
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _track_change)
+
+# Los cambios solo se notifican cuando el commit ha terminado; un rollback los descarta
+@event.listens_for(Session, "after_commit")
+def _notify_changes(session):
+    changes = session.info.pop("changed_rows", None)
+    if changes:
+        for listener in change_listeners:
+            listener(changes)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("changed_rows", None)
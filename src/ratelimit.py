@@ -0,0 +1,255 @@
+"""
+Token-bucket rate limiting per client with per-endpoint costs. A client is its X-API-Key
+when that key has its own quota in RATELIMIT_QUOTAS, otherwise its IP address.
+
+Every client has a bucket of `burst` tokens that refills at `rate` tokens per second;
+each request takes the cost of its endpoint (listing a whole table costs more than
+reading one row) and is answered 429 with Retry-After when the bucket runs dry.
+
+- memory: buckets per process (default; with N gunicorn workers the limit is N times larger)
+- redis:  buckets shared by every worker and host (requires the optional `redis` package)
+
+Decisions are counted in /metrics as ratelimit_decisions_total{endpoint,decision}.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import g, jsonify, request
+from metrics import registry
+from utils import is_truthy
+
+try:
+    import redis
+except ImportError:  # dependencia opcional, solo necesaria con RATELIMIT_STORAGE=redis
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Coste por endpoint de Flask; el resto cuesta DEFAULT_COST
+DEFAULT_COST = 1
+DEFAULT_COSTS = {
+    "get_people": 2, "get_planets": 2, "get_vehicles": 2, "get_users": 2,
+    "export_people": 20, "export_planets": 20, "export_vehicles": 20,
+    "search_catalogue": 3, "get_leaderboard": 2,
+    "add_favorites_batch": 5, "delete_favorites_batch": 5,
+}
+# Un listado con ?all=true devuelve la tabla entera, igual que una exportación
+FULL_LIST_ENDPOINTS = {"get_people", "get_planets", "get_vehicles", "get_users"}
+FULL_LIST_COST = 20
+# Rutas que nunca se limitan (el scraper de métricas, ficheros estáticos)
+DEFAULT_EXEMPT = {"metrics", "static"}
+LIMITED_MESSAGE = "Too many requests, retry later"
+
+ratelimit_decisions = registry.counter(
+    "ratelimit_decisions_total",
+    "Rate limiter decisions (allowed, limited, or error when the store failed and the request was let through).",
+    ("endpoint", "decision"),
+)
+
+Decision = namedtuple("Decision", "allowed limit remaining retry_after cost")
+
+
+class MemoryStore:
+    """Buckets in a per-process dict, bounded so that many distinct IPs cannot exhaust memory."""
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # clave -> (tokens, instante de la última actualización)
+        self._lock = threading.Lock()
+
+    def take(self, key, cost, rate, burst):
+        """Takes `cost` tokens if there are enough; returns (allowed, tokens left)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            # Se descartan los clientes inactivos más antiguos (su cubo estaría lleno de nuevo)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, tokens
+
+
+# Recarga y consumo atómicos en el servidor; el reloj es el de Redis (común a todos los hosts)
+TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisStore:
+    """Buckets in a Redis-protocol server, updated by a Lua script in one round trip."""
+
+    name = "redis"
+    blocking = True
+
+    def __init__(self, url, prefix="starwars:ratelimit:"):
+        if redis is None:
+            raise RuntimeError("RATELIMIT_STORAGE=redis requires the 'redis' package")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._take = self.client.register_script(TAKE_SCRIPT)
+
+    def take(self, key, cost, rate, burst):
+        allowed, tokens = self._take(keys=[self.prefix + key], args=[rate, burst, cost])
+        return bool(allowed), float(tokens)
+
+
+def create_store(name="memory", url=None):
+    if name == "memory":
+        return MemoryStore()
+    if name == "redis":
+        return RedisStore(url or "redis://localhost:6379/0")
+    raise ValueError(f"Unknown rate limit storage: {name}")
+
+
+def parse_quotas(value):
+    """{"key1": (rate, burst), ...} from "key1=50/200,key2=1/10" (tokens per second / burst)."""
+    quotas = {}
+    for item in (value or "").split(","):
+        api_key, _, limits = item.strip().partition("=")
+        if not api_key or not limits:
+            continue
+        rate, _, burst = limits.partition("/")
+        quotas[api_key.strip()] = (float(rate), float(burst or rate))
+    return quotas
+
+
+def client_id(api_key, remote_addr):
+    # La API key no se guarda en claro en el almacén compartido
+    if api_key:
+        return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:24]
+    return "ip:" + (remote_addr or "unknown")
+
+
+class RateLimiter:
+    def __init__(self, store, rate=10, burst=50, costs=None, quotas=None, exempt=DEFAULT_EXEMPT):
+        self.store = store
+        self.rate = rate
+        self.burst = burst
+        self.costs = dict(DEFAULT_COSTS, **(costs or {}))
+        self.quotas = quotas or {}
+        self.exempt = set(exempt)
+        self.validate()
+
+    def validate(self):
+        """Fails at startup on limits that could never be met: a bucket that does not refill
+        (rate 0 would also divide by zero in Retry-After) or one smaller than an endpoint cost."""
+        max_cost = max([FULL_LIST_COST, DEFAULT_COST, *self.costs.values()])
+        # Las claves de las cuotas no aparecen en el mensaje: son credenciales
+        limits = [("RATELIMIT_RATE/RATELIMIT_BURST", self.rate, self.burst)]
+        limits += [(f"RATELIMIT_QUOTAS entry {position}", rate, burst)
+                   for position, (rate, burst) in enumerate(self.quotas.values(), 1)]
+        for name, rate, burst in limits:
+            if not rate > 0:
+                raise ValueError(f"{name}: the rate must be greater than 0, got {rate}")
+            if burst < max_cost:
+                raise ValueError(f"{name}: the burst ({burst}) must be at least the highest endpoint cost ({max_cost})")
+
+    def cost(self, endpoint, args):
+        if endpoint in FULL_LIST_ENDPOINTS and is_truthy(args.get("all", "false")):
+            return FULL_LIST_COST
+        return self.costs.get(endpoint, DEFAULT_COST)
+
+    def check(self, endpoint, args, api_key=None, remote_addr=None):
+        """Decision for one request, or None if the endpoint is exempt."""
+        if endpoint in self.exempt:
+            return None
+        # Solo las claves con cuota propia identifican al cliente: con una clave inventada
+        # en cada petición se podría estrenar un cubo lleno cada vez
+        if api_key not in self.quotas:
+            api_key = None
+        rate, burst = self.quotas[api_key] if api_key else (self.rate, self.burst)
+        cost = self.cost(endpoint, args)
+        try:
+            allowed, tokens = self.store.take(client_id(api_key, remote_addr), cost, rate, burst)
+        except Exception:
+            # Si el almacén compartido falla se deja pasar la petición antes que tumbar la API
+            logger.warning("Rate limit store %s failed; request allowed", self.store.name, exc_info=True)
+            ratelimit_decisions.inc(endpoint, "error")
+            return None
+        ratelimit_decisions.inc(endpoint, "allowed" if allowed else "limited")
+        retry_after = 0 if allowed else math.ceil((cost - tokens) / rate)
+        return Decision(allowed, burst, int(tokens), retry_after, cost)
+
+    @staticmethod
+    def headers(decision):
+        headers = [("RateLimit-Limit", str(int(decision.limit))), ("RateLimit-Remaining", str(decision.remaining))]
+        if not decision.allowed:
+            headers.append(("Retry-After", str(decision.retry_after)))
+        return headers
+
+
+def init_app(app):
+    """Limits every request before it reaches the view.
+
+    RATELIMIT_ENABLED, RATELIMIT_RATE (tokens per second), RATELIMIT_BURST (bucket size),
+    RATELIMIT_STORAGE (memory or redis) and RATELIMIT_STORAGE_URL, RATELIMIT_COSTS
+    ({endpoint: cost}, merged over DEFAULT_COSTS) and RATELIMIT_QUOTAS ({api key: (rate, burst)}).
+    The client IP is request.remote_addr: behind a proxy, wrap the app in ProxyFix first."""
+    app.config.setdefault("RATELIMIT_ENABLED", False)
+    app.config.setdefault("RATELIMIT_RATE", 10)
+    app.config.setdefault("RATELIMIT_BURST", 50)
+    app.config.setdefault("RATELIMIT_STORAGE", "memory")
+    app.config.setdefault("RATELIMIT_STORAGE_URL", None)
+    app.config.setdefault("RATELIMIT_COSTS", {})
+    app.config.setdefault("RATELIMIT_QUOTAS", {})
+    if not app.config["RATELIMIT_ENABLED"]:
+        return None
+
+    limiter = RateLimiter(
+        create_store(app.config["RATELIMIT_STORAGE"], app.config["RATELIMIT_STORAGE_URL"]),
+        rate=app.config["RATELIMIT_RATE"],
+        burst=app.config["RATELIMIT_BURST"],
+        costs=app.config["RATELIMIT_COSTS"],
+        quotas=app.config["RATELIMIT_QUOTAS"],
+    )
+    app.extensions["ratelimit"] = limiter
+
+    @app.before_request
+    def _apply_rate_limit():
+        if request.method == "OPTIONS":
+            return None
+        decision = limiter.check(
+            request.endpoint or "unmatched", request.args, request.headers.get("X-API-Key"), request.remote_addr
+        )
+        g.ratelimit_decision = decision
+        if decision is not None and not decision.allowed:
+            response = jsonify({"message": LIMITED_MESSAGE})
+            response.status_code = 429
+            response.headers.extend(limiter.headers(decision))
+            return response
+        return None
+
+    @app.after_request
+    def _add_rate_limit_headers(response):
+        decision = g.get("ratelimit_decision")
+        if decision is not None and decision.allowed:
+            response.headers.extend(limiter.headers(decision))
+        return response
+
+    return limiter
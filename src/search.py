@@ -0,0 +1,167 @@
+"""
+Full-text search over People, Planets and Vehicles.
+
+The index lives in the `catalogue_search` table: an FTS5 virtual table on SQLite and a
+table with a generated tsvector column + GIN index on Postgres (other engines fall
+back to LIKE). It is kept up to date row by row from the mapper events, inside the
+same transaction as the change.
+"""
+import re
+from sqlalchemy import event, inspect, text
+from models import People, Planets, Vehicles
+
+# Modelo -> (campo con más peso, campos secundarios)
+SEARCH_FIELDS = {
+    People: ("name", ()),
+    Planets: ("name", ("terrain", "climate")),
+    Vehicles: ("name", ("model", "manufacturer")),
+}
+
+SEARCH_MODELS = {model.__tablename__: model for model in SEARCH_FIELDS}
+
+INDEX_TABLE = "catalogue_search"
+
+# Motores en los que ya se ha comprobado que existe el índice (solo se guarda el sí: si falta
+# se vuelve a mirar, porque lo puede crear la migración o `flask search-reindex` en otro proceso)
+_ready = {}
+
+
+def document(model, row):
+    name_field, body_fields = SEARCH_FIELDS[model]
+    return {
+        "entity_type": model.__tablename__,
+        "entity_id": row["id"],
+        "name": row[name_field] or "",
+        "body": " ".join(row[field] or "" for field in body_fields),
+    }
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Alembic autogenerate no debe proponer borrar el índice (ni las tablas internas de FTS5)
+    return not (type_ == "table" and name.startswith(INDEX_TABLE))
+
+
+def create_index(connection):
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} USING fts5("
+            "entity_type UNINDEXED, entity_id UNINDEXED, name, body, "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        ))
+    elif dialect == "postgresql":
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {INDEX_TABLE} ("
+            "entity_type VARCHAR(20) NOT NULL, entity_id INTEGER NOT NULL, "
+            "name TEXT NOT NULL, body TEXT NOT NULL, "
+            "document tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple', name), 'A') || setweight(to_tsvector('simple', body), 'B')) STORED, "
+            "PRIMARY KEY (entity_type, entity_id))"
+        ))
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{INDEX_TABLE}_document ON {INDEX_TABLE} USING GIN (document)"
+        ))
+    else:
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {INDEX_TABLE} ("
+            "entity_type VARCHAR(20) NOT NULL, entity_id INTEGER NOT NULL, "
+            "name VARCHAR(255) NOT NULL, body VARCHAR(255) NOT NULL, "
+            "PRIMARY KEY (entity_type, entity_id))"
+        ))
+
+
+def rebuild_index(connection):
+    """Creates the index if needed and refills it from the catalogue tables."""
+    create_index(connection)
+    connection.execute(text(f"DELETE FROM {INDEX_TABLE}"))
+    for model, (name_field, body_fields) in SEARCH_FIELDS.items():
+        table = model.__table__
+        columns = ["id", name_field, *body_fields]
+        rows = connection.execute(table.select().with_only_columns(*(table.c[name] for name in columns)))
+        documents = [document(model, row._mapping) for row in rows]
+        if documents:
+            connection.execute(_insert_statement(), documents)
+    _ready[connection.engine.url] = True
+
+
+def index_exists(connection):
+    url = connection.engine.url
+    if not _ready.get(url):
+        _ready[url] = inspect(connection).has_table(INDEX_TABLE)
+    return _ready[url]
+
+
+def _insert_statement():
+    return text(
+        f"INSERT INTO {INDEX_TABLE} (entity_type, entity_id, name, body) "
+        "VALUES (:entity_type, :entity_id, :name, :body)"
+    )
+
+
+def _delete_statement():
+    return text(f"DELETE FROM {INDEX_TABLE} WHERE entity_type = :entity_type AND entity_id = :entity_id")
+
+
+def _reindex_row(mapper, connection, target):
+    if not index_exists(connection):
+        return
+    model = type(target)
+    row = {name: getattr(target, name) for name in ("id", SEARCH_FIELDS[model][0], *SEARCH_FIELDS[model][1])}
+    connection.execute(_delete_statement(), {"entity_type": model.__tablename__, "entity_id": target.id})
+    connection.execute(_insert_statement(), document(model, row))
+
+
+def _unindex_row(mapper, connection, target):
+    if index_exists(connection):
+        connection.execute(_delete_statement(), {"entity_type": type(target).__tablename__, "entity_id": target.id})
+
+
+for _model in SEARCH_FIELDS:
+    event.listen(_model, "after_insert", _reindex_row)
+    event.listen(_model, "after_update", _reindex_row)
+    event.listen(_model, "after_delete", _unindex_row)
+
+
+def tokenize(query):
+    return re.findall(r"\w+", query.lower())
+
+
+def search(connection, query, types, limit, offset):
+    """Returns [(entity_type, entity_id, score)] ranked from best to worst."""
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    params = {"limit": limit, "offset": offset}
+    type_filter = ""
+    if types:
+        names = [f"type_{position}" for position in range(len(types))]
+        type_filter = " AND entity_type IN ({})".format(", ".join(":" + name for name in names))
+        params.update(zip(names, types))
+
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        # Cada término se busca como prefijo; bm25 da valores más bajos a los mejores
+        params["match"] = " ".join('"{}"*'.format(token) for token in tokens)
+        sql = (
+            f"SELECT entity_type, entity_id, -bm25({INDEX_TABLE}, 0, 0, 10.0, 1.0) AS score "
+            f"FROM {INDEX_TABLE} WHERE {INDEX_TABLE} MATCH :match{type_filter} "
+            "ORDER BY score DESC, entity_id LIMIT :limit OFFSET :offset"
+        )
+    elif dialect == "postgresql":
+        params["tsquery"] = " & ".join(f"{token}:*" for token in tokens)
+        sql = (
+            "SELECT entity_type, entity_id, ts_rank(document, query) AS score "
+            f"FROM {INDEX_TABLE}, to_tsquery('simple', :tsquery) AS query "
+            f"WHERE document @@ query{type_filter} "
+            "ORDER BY score DESC, entity_id LIMIT :limit OFFSET :offset"
+        )
+    else:
+        conditions = []
+        for position, token in enumerate(tokens):
+            params[f"like_{position}"] = f"%{token}%"
+            conditions.append(f"(LOWER(name) LIKE :like_{position} OR LOWER(body) LIKE :like_{position})")
+        sql = (
+            f"SELECT entity_type, entity_id, 1.0 AS score FROM {INDEX_TABLE} "
+            "WHERE {}{} ORDER BY entity_type, entity_id LIMIT :limit OFFSET :offset".format(" AND ".join(conditions), type_filter)
+        )
+    return [tuple(row) for row in connection.execute(text(sql), params)]
@@ -1,61 +1,211 @@
-from app import db, app  # Importa db y app desde el archivo principal
-from models import Users, Articles, Tags, ArticlesTags  # Asegúrate de que 'models' sea el archivo donde están definidas las clases
-from admin import setup_admin  # Asegúrate de importar la configuración de admin
-
-# Configuración de Admin
-setup_admin(app)
-
-# Seeder para agregar datos de prueba
-def seed_data():
-    # Limpiar las tablas para evitar duplicados
-    db.session.query(ArticlesTags).delete()
-    db.session.query(Articles).delete()
-    db.session.query(Users).delete()
-    db.session.query(Tags).delete()
-
-    # Crear usuarios
-    user1 = Users(email="alice@example.com", password="password123", is_active=True)
-    user2 = Users(email="bob@example.com", password="password123", is_active=True)
-    
-    db.session.add(user1)
-    db.session.add(user2)
-
-    # Crear tags
-    tag1 = Tags(name="Technology")
-    tag2 = Tags(name="Science")
-    tag3 = Tags(name="Lifestyle")
-    
-    db.session.add(tag1)
-    db.session.add(tag2)
-    db.session.add(tag3)
-
-    # Confirmar las transacciones para usuarios y tags
-    db.session.commit()
-
-    # Crear artículos (después de confirmar los usuarios y tags para obtener sus IDs)
-    article1 = Articles(title="The Future of AI", content="This article discusses the advancements in AI.", user_id=user1.id)
-    article2 = Articles(title="Healthy Living Tips", content="This article gives tips for a healthy lifestyle.", user_id=user2.id)
-    
-    db.session.add(article1)
-    db.session.add(article2)
-
-    # Confirmar las transacciones para artículos
-    db.session.commit()
-
-    # Crear relaciones entre artículos y tags
-    articlestag1 = ArticlesTags(article_id=article1.id, tag_id=tag1.id, extra_info="AI and its future in technology.")
-    articlestag2 = ArticlesTags(article_id=article1.id, tag_id=tag2.id, extra_info="Exploring AI's impact on science.")
-    articlestag3 = ArticlesTags(article_id=article2.id, tag_id=tag3.id, extra_info="Health is essential for a good lifestyle.")
-
-    db.session.add(articlestag1)
-    db.session.add(articlestag2)
-    db.session.add(articlestag3)
-
-    # Confirmar las transacciones para las relaciones
-    db.session.commit()
-
-    print("Datos de prueba insertados correctamente.")
-
-# Llamar a la función de seeding
-if __name__ == "__main__":
-    seed_data()
+"""
+Bulk seeder for synthetic Star Wars data: `flask seed --rows 100000` (asks for confirmation
+unless --yes is given)
+
+Rows are generated from a seeded random.Random (same seed, same data) and written in
+batches with Core inserts, or with COPY on Postgres (psycopg2). Existing users,
+favorites and catalogue rows are deleted first. The numeric shadow columns are filled
+from the text ones, the favorite counters are recomputed, the search index is rebuilt and the cache versions are bumped.
+"""
+import csv
+import io
+import random
+import time
+import click
+from flask import current_app
+from sqlalchemy import text
+from models import db, fill_numeric_columns, recount_favorites, Users, People, Planets, Vehicles, Favorites, FAVORITE_TYPE_NAMES
+import search
+
+DEFAULT_BATCH_SIZE = 5000
+
+FIRST_NAMES = ("Luke", "Leia", "Han", "Anakin", "Padme", "Obi-Wan", "Rey", "Finn", "Poe", "Lando",
+               "Mace", "Qui-Gon", "Ahsoka", "Jyn", "Cassian", "Bodhi", "Wedge", "Biggs", "Kylo", "Din")
+LAST_NAMES = ("Skywalker", "Organa", "Solo", "Amidala", "Kenobi", "Dameron", "Calrissian", "Windu",
+              "Jinn", "Tano", "Erso", "Andor", "Rook", "Antilles", "Darklighter", "Djarin", "Fett")
+PLANET_PREFIXES = ("Tato", "Alde", "Hoth", "Dago", "Bes", "Endo", "Naboo", "Cor", "Kami", "Geo",
+                   "Muta", "Yavi", "Stew", "Ryl", "Kash", "Jakk", "Lothal", "Mala")
+PLANET_SUFFIXES = ("ine", "aan", "oth", "ba", "ia")
+CLIMATES = ("arid", "temperate", "frozen", "murky", "tropical", "windy", "hot", "polluted")
+TERRAINS = ("desert", "grasslands", "mountains", "tundra", "swamp", "jungle", "ocean", "cityscape")
+VEHICLE_NAMES = (("Sand", "Snow", "Cloud", "Star", "Speeder"), ("Crawler", "Speeder", "Car", "Skiff", "Bike"))
+VEHICLE_CLASSES = ("wheeled", "repulsorcraft", "starfighter", "airspeeder", "walker", "speeder")
+MANUFACTURERS = ("Corellia Mining Corporation", "Incom Corporation", "Sienar Fleet Systems",
+                 "Kuat Drive Yards", "Aratech Repulsor Company", "SoroSuub Corporation")
+
+
+def maybe_unknown(rng, value, ratio=0.1):
+    return "unknown" if rng.random() < ratio else value
+
+
+# Generadores de filas: los ids son explícitos para que los favoritos puedan referenciarlos
+
+def user_rows(rng, count):
+    for entity_id in range(1, count + 1):
+        yield {"id": entity_id, "email": f"user{entity_id}@example.com", "password": "password123", "is_active": True}
+
+
+def people_rows(rng, count):
+    for entity_id in range(1, count + 1):
+        yield {
+            "id": entity_id,
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {entity_id}",
+            "height": maybe_unknown(rng, str(rng.randint(60, 260))),
+            "mass": maybe_unknown(rng, str(rng.randint(20, 180))),
+            "hair_color": rng.choice(("blond", "brown", "black", "none", "white")),
+            "skin_color": rng.choice(("fair", "light", "dark", "green", "gold")),
+            "eye_color": rng.choice(("blue", "brown", "yellow", "red", "hazel")),
+            "birth_year": f"{rng.randint(8, 900)}BBY",
+            "gender": rng.choice(("male", "female", "n/a")),
+            "user_id": None,
+        }
+
+
+def planet_rows(rng, count):
+    for entity_id in range(1, count + 1):
+        yield {
+            "id": entity_id,
+            "name": f"{rng.choice(PLANET_PREFIXES)}{rng.choice(PLANET_SUFFIXES)} {entity_id}",
+            "climate": rng.choice(CLIMATES),
+            "diameter": maybe_unknown(rng, str(rng.randint(1000, 200000))),
+            "gravity": f"{rng.uniform(0.1, 3):.1f} standard",
+            "orbital_period": maybe_unknown(rng, str(rng.randint(100, 5000))),
+            "population": maybe_unknown(rng, str(rng.randint(1000, 10 ** 12)), ratio=0.2),
+            "rotation_period": str(rng.randint(10, 60)),
+            "surface_water": str(rng.randint(0, 100)),
+            "terrain": rng.choice(TERRAINS),
+        }
+
+
+def vehicle_rows(rng, count):
+    for entity_id in range(1, count + 1):
+        yield {
+            "id": entity_id,
+            "name": f"{rng.choice(VEHICLE_NAMES[0])} {rng.choice(VEHICLE_NAMES[1])} {entity_id}",
+            "cargo_capacity": maybe_unknown(rng, str(rng.randint(0, 100000))),
+            "consumables": f"{rng.randint(1, 12)} months",
+            "cost_in_credits": maybe_unknown(rng, str(rng.randint(1000, 10 ** 7))),
+            "crew": str(rng.randint(1, 50)),
+            "length": f"{rng.uniform(2, 200):.1f}",
+            "manufacturer": rng.choice(MANUFACTURERS),
+            "max_atmosphering_speed": str(rng.randint(30, 2000)),
+            "model": f"Model {rng.randint(1, 99)}",
+            "passengers": str(rng.randint(0, 100)),
+            "vehicle_class": rng.choice(VEHICLE_CLASSES),
+        }
+
+
+def favorite_rows(rng, users, per_user, counts):
+    types = [favorite_type for favorite_type, count in counts.items() if count]
+    total = sum(counts[favorite_type] for favorite_type in types)
+    favorite_id = 0
+    for user_id in range(1, users + 1):
+        chosen = set()
+        while len(chosen) < min(per_user, total):
+            favorite_type = rng.choice(types)
+            chosen.add((favorite_type, rng.randint(1, counts[favorite_type])))
+        for favorite_type, entity_id in sorted(chosen):
+            favorite_id += 1
+            yield {"id": favorite_id, "user_id": user_id, "favorite_type": favorite_type,
+                   "favorite_id": entity_id, "extra_info": None}
+
+
+def batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def copy_rows(connection, table, rows):
+    # COPY ... FROM STDIN en CSV: mucho más rápido que INSERT en Postgres
+    columns = list(rows[0])
+    # COPY no pasa por los tipos de SQLAlchemy: se aplican a mano (p. ej. FavoriteType -> código)
+    processors = [table.c[column].type.bind_processor(connection.dialect) for column in columns]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        values = [process(row[column]) if process else row[column] for column, process in zip(columns, processors)]
+        writer.writerow(["\\N" if value is None else value for value in values])
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            "COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL '\\N')".format(table.name, ", ".join(columns)), buffer
+        )
+    finally:
+        cursor.close()
+
+
+def insert_rows(connection, model, rows, batch_size):
+    table = model.__table__
+    use_copy = connection.dialect.name == "postgresql" and connection.dialect.driver == "psycopg2"
+    inserted = 0
+    for batch in batches(rows, batch_size):
+        if hasattr(model, "numeric_fields"):
+            for row in batch:
+                fill_numeric_columns(model, row)
+        if use_copy:
+            copy_rows(connection, table, batch)
+        else:
+            connection.execute(table.insert(), batch)
+        inserted += len(batch)
+    # Con ids explícitos la secuencia de Postgres no avanza sola
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table.name}"
+        ))
+    return inserted
+
+
+def seed_database(connection, rows, users=None, favorites_per_user=10, random_seed=42, batch_size=DEFAULT_BATCH_SIZE):
+    """Replaces users, favorites, people, planets and vehicles with generated rows.
+    Returns the number of rows inserted per table."""
+    rng = random.Random(random_seed)
+    users = max(10, rows // 10) if users is None else users
+    entity_counts = {FAVORITE_TYPE_NAMES[model]: rows for model in (People, Planets, Vehicles)}
+
+    for model in (Favorites, People, Planets, Vehicles, Users):
+        connection.execute(model.__table__.delete())
+    counts = {
+        "users": insert_rows(connection, Users, user_rows(rng, users), batch_size),
+        "people": insert_rows(connection, People, people_rows(rng, rows), batch_size),
+        "planets": insert_rows(connection, Planets, planet_rows(rng, rows), batch_size),
+        "vehicles": insert_rows(connection, Vehicles, vehicle_rows(rng, rows), batch_size),
+    }
+    counts["favorites"] = insert_rows(
+        connection, Favorites, favorite_rows(rng, users, favorites_per_user, entity_counts), batch_size
+    )
+    # Los favoritos se insertan por Core: los contadores se calculan de una vez al final
+    recount_favorites(connection)
+    search.rebuild_index(connection)
+    return counts
+
+
+def register_seed_command(app):
+    @app.cli.command("seed")
+    @click.option("--rows", default=1000, show_default=True, help="People, planets and vehicles to create (each).")
+    @click.option("--users", type=int, help="Users to create (default: rows / 10, at least 10).")
+    @click.option("--favorites-per-user", default=10, show_default=True)
+    @click.option("--seed", "random_seed", default=42, show_default=True, help="Random seed: same seed, same data.")
+    @click.option("--batch-size", default=DEFAULT_BATCH_SIZE, show_default=True)
+    @click.option("--yes", is_flag=True, help="Do not ask for confirmation before deleting the current data.")
+    def seed(rows, users, favorites_per_user, random_seed, batch_size, yes):
+        """Deletes the current data and loads a synthetic dataset."""
+        # DATABASE_URL puede apuntar a producción: se muestra el destino y se pide confirmación
+        if not yes:
+            target = db.engine.url.render_as_string(hide_password=True)
+            click.confirm(f"This deletes every user, favorite and catalogue row in {target}. Continue?", abort=True)
+        started = time.perf_counter()
+        with db.engine.begin() as connection:
+            counts = seed_database(connection, rows, users, favorites_per_user, random_seed, batch_size)
+        # Los datos cambiaron por Core: se invalidan la caché, los ETag y el autocompletado
+        catalogue_cache = current_app.extensions["catalogue_cache"]
+        for tablename in ("users", "favorites", "people", "planets", "vehicles"):
+            catalogue_cache.invalidate(tablename)
+        summary = ", ".join(f"{count} {tablename}" for tablename, count in counts.items())
+        print(f"Seeded {summary} in {time.perf_counter() - started:.1f}s")
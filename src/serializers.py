@@ -0,0 +1,106 @@
+"""
+Schema-driven serialization: Core selects that return plain row tuples (no ORM objects,
+no identity map) turned into dicts with precompiled field lists, plus a Flask JSON
+provider that uses orjson when it is installed.
+"""
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import select
+from metrics import serialization_timer
+from models import Users, People, Planets, Vehicles, Favorites
+from utils import APIException
+
+try:
+    import orjson
+except ImportError:  # dependencia opcional; sin ella se usa el json de la stdlib
+    orjson = None
+
+
+class RowSerializer:
+    """Serializes rows of a model using a fixed list of columns (the same keys as Model.serialize())."""
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = tuple(fields)
+        self.columns = tuple(model.__table__.c[field] for field in self.fields)
+        self._subsets = {}
+
+    def only(self, fields):
+        fields = tuple(fields)
+        if fields == self.fields:
+            return self
+        if fields not in self._subsets:
+            self._subsets[fields] = RowSerializer(self.model, fields)
+        return self._subsets[fields]
+
+    def parse_fields(self, value):
+        """Serializer restricted to ?fields=a,b,c (validated against the public fields).
+        `id` is always included because cursors and references depend on it."""
+        if not value:
+            return self
+        requested = {field.strip() for field in value.split(",") if field.strip()}
+        unknown = sorted(requested.difference(self.fields))
+        if unknown:
+            raise APIException(
+                "Unknown fields: {}. Allowed: {}".format(", ".join(unknown), ", ".join(self.fields)),
+                status_code=400,
+            )
+        return self.only(field for field in self.fields if field == "id" or field in requested)
+
+    def select(self):
+        return select(*self.columns)
+
+    def to_dict(self, row):
+        return dict(zip(self.fields, row))
+
+    def to_dicts(self, rows):
+        fields = self.fields
+        return [dict(zip(fields, row)) for row in rows]
+
+
+SERIALIZERS = {
+    Users: RowSerializer(Users, ("id", "email")),
+    People: RowSerializer(People, (
+        "id", "name", "height", "mass", "hair_color", "skin_color",
+        "eye_color", "birth_year", "gender", "user_id",
+    )),
+    Planets: RowSerializer(Planets, (
+        "id", "name", "climate", "diameter", "gravity", "orbital_period",
+        "population", "rotation_period", "surface_water", "terrain",
+    )),
+    Vehicles: RowSerializer(Vehicles, (
+        "id", "name", "cargo_capacity", "consumables", "cost_in_credits", "crew", "length",
+        "manufacturer", "max_atmosphering_speed", "model", "passengers", "vehicle_class",
+    )),
+    Favorites: RowSerializer(Favorites, ("id", "user_id", "favorite_id", "favorite_type", "extra_info")),
+}
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, falling back to the default provider without it."""
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode()
+
+    def dumps_bytes(self, obj):
+        if orjson is None:
+            return super().dumps(obj).encode()
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=options)
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # El tiempo de codificación se anota en las métricas de la petición
+        with serialization_timer():
+            if orjson is None:
+                return super().response(*args, **kwargs)
+            obj = self._prepare_response_obj(args, kwargs)
+            # Se escriben directamente los bytes, sin pasar por str
+            return self._app.response_class(self.dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
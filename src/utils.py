@@ -1,4 +1,11 @@
+import base64
+import json
 from flask import jsonify, url_for
+from sqlalchemy import tuple_
+
+# Límites de la paginación por cursor
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
 
 class APIException(Exception):
     status_code = 400
@@ -39,3 +46,112 @@ def generate_sitemap(app):
         <p>Start working on your proyect by following the <a href="https://start.4geeksacademy.com/starters/flask" target="_blank">Quick Start</a></p>
         <p>Remember to specify a real endpoint path like: </p>
         <ul style="text-align: left;">"""+links_html+"</ul></div>"
+
+def encode_cursor(values):
+    # El cursor es opaco para el cliente: JSON en base64 con los valores de la última fila
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise APIException("Invalid cursor", status_code=400)
+    if not isinstance(values, list) or not values:
+        raise APIException("Invalid cursor", status_code=400)
+    return values
+
+def parse_limit(args):
+    limit = args.get("limit", DEFAULT_PAGE_SIZE)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise APIException("'limit' must be an integer", status_code=400)
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise APIException(f"'limit' must be between 1 and {MAX_PAGE_SIZE}", status_code=400)
+    return limit
+
+def is_truthy(value):
+    return str(value).lower() in ("1", "true", "yes")
+
+def paginate(session, serializer, args, stmt=None, sort_column=None, descending=False):
+    """Keyset pagination: each page is a bounded index range scan.
+
+    Without `sort_column` the key is the primary key and the cursor is [id]. With it,
+    rows are ordered by (sort_column NULLS LAST, id) and the cursor is [value, id]."""
+    limit = parse_limit(args)
+    key = serializer.model.__table__.c.id
+    stmt = serializer.select() if stmt is None else stmt
+    after = decode_cursor(args["after"]) if args.get("after") else None
+
+    if sort_column is None:
+        if after:
+            if not isinstance(after[-1], int):
+                raise APIException("Invalid cursor", status_code=400)
+            stmt = stmt.where(key > after[-1])
+        # Se pide una fila de más para saber si existe una página siguiente
+        rows = session.execute(stmt.order_by(key).limit(limit + 1)).all()
+    else:
+        # La columna de orden se añade al final del SELECT para poder construir el cursor;
+        # to_dicts la ignora porque solo recorre los campos del serializador
+        stmt = stmt.add_columns(sort_column)
+        value = last_id = None
+        if after:
+            if len(after) != 2 or not isinstance(after[1], int):
+                raise APIException("Invalid cursor", status_code=400)
+            value, last_id = after
+
+        # Las filas sin valor van al final, ordenadas solo por id
+        null_rows = stmt.where(sort_column.is_(None)).order_by(key.desc() if descending else key.asc())
+        rows = []
+        if after and value is None:
+            null_rows = null_rows.where(key < last_id if descending else key > last_id)
+        else:
+            # Tramo con valor: un rango sobre el índice (sort_column, id) con la comparación de
+            # filas (col, id) > (valor, id). Sin NULLS LAST en el ORDER BY, que ya no hace falta
+            # al excluir los NULL, para que Postgres recorra el índice en cualquier sentido.
+            if after:
+                position, cursor = tuple_(sort_column, key), tuple_(value, last_id)
+                condition = position < cursor if descending else position > cursor
+            else:
+                condition = sort_column.is_not(None)
+            order = (sort_column.desc(), key.desc()) if descending else (sort_column.asc(), key.asc())
+            rows = session.execute(stmt.where(condition).order_by(*order).limit(limit + 1)).all()
+        # Solo si el tramo con valor se agota se pasa a las filas NULL
+        if len(rows) <= limit:
+            rows += session.execute(null_rows.limit(limit + 1 - len(rows))).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    results = serializer.to_dicts(rows)
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor([last.id] if sort_column is None else [last[-1], last.id])
+
+    return {
+        "results": results,
+        "count": len(results),
+        "limit": limit,
+        "max_limit": MAX_PAGE_SIZE,
+        "next": next_cursor,
+    }
+
+def stream_json_array(chunks, dumps=json.dumps):
+    # Emite un array JSON trozo a trozo sin construir la lista completa en memoria
+    yield "["
+    first = True
+    for chunk in chunks:
+        body = ",".join(dumps(item) for item in chunk)
+        if not body:
+            continue
+        yield body if first else "," + body
+        first = False
+    yield "]"
+
+def stream_ndjson(chunks, dumps=json.dumps):
+    for chunk in chunks:
+        if chunk:
+            yield "".join(dumps(item) + "\n" for item in chunk)
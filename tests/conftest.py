@@ -0,0 +1,35 @@
+"""
+Test configuration: a throwaway SQLite database seeded with the deterministic data of
+src/seeder.py, and the file cache backend (shared, blocking) so both servers exercise it.
+The environment must be set before `app` is imported, since it reads it at import time.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+TMP = tempfile.mkdtemp(prefix="starwars-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TMP, 'test.db')}"
+os.environ["CACHE_BACKEND"] = "file"
+os.environ["CACHE_URL"] = os.path.join(TMP, "cache.db")
+os.environ["RATELIMIT_ENABLED"] = "false"
+os.environ.pop("DATABASE_REPLICA_URLS", None)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import app, db
+    from seeder import seed_database
+
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as connection:
+            seed_database(connection, rows=30, users=5, favorites_per_user=3)
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,168 @@
+"""The native async routes of src/asgi.py must answer exactly like the Flask views."""
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+URLS = [
+    "/people",
+    "/people?limit=5",
+    "/people?sort=-height&limit=4",
+    "/people?sort=mass&limit=7",
+    "/people?gender=male&limit=3",
+    "/people?fields=name,height&limit=3",
+    "/people?ids=3,999,1",
+    "/people?ids=998",
+    "/people?sort=name",
+    "/people?limit=0",
+    "/people/1",
+    "/people/999",
+    "/planets?all=true",
+    "/planets/2",
+    "/vehicles?sort=-crew&limit=5",
+    "/vehicles/3",
+    "/users",
+    "/users/1",
+    "/users/999",
+]
+# Cabeceras que deben coincidir (Server-Timing y las de CORS/Date dependen del servidor)
+COMPARED_HEADERS = ("etag", "last-modified", "cache-control", "content-type")
+
+
+@pytest.fixture(scope="module")
+def asgi_get(app):
+    import asgi
+
+    loop = asyncio.new_event_loop()
+
+    def get(url, headers=()):
+        path, _, query = url.partition("?")
+        scope = {
+            "type": "http", "method": "GET", "path": path, "root_path": "", "scheme": "http",
+            "query_string": query.encode(), "http_version": "1.1",
+            "headers": [(name.lower().encode(), value.encode()) for name, value in headers],
+            "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+        }
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        loop.run_until_complete(asgi.application(scope, receive, send))
+        start = messages[0]
+        headers = {name.decode().lower(): value.decode() for name, value in start["headers"]}
+        return start["status"], headers, b"".join(message.get("body", b"") for message in messages[1:])
+
+    yield get
+    loop.run_until_complete(asgi.async_engine.dispose())
+    loop.close()
+
+
+def flask_get(client, url, headers=()):
+    response = client.get(url, headers=dict(headers))
+    return response.status_code, {name.lower(): value for name, value in response.headers.items()}, response.data
+
+
+def assert_same(asgi_response, flask_response):
+    asgi_status, asgi_headers, asgi_body = asgi_response
+    flask_status, flask_headers, flask_body = flask_response
+    assert asgi_status == flask_status
+    assert (json.loads(asgi_body) if asgi_body else None) == (json.loads(flask_body) if flask_body else None)
+    for name in COMPARED_HEADERS:
+        assert asgi_headers.get(name) == flask_headers.get(name), name
+
+
+@pytest.mark.parametrize("url", URLS)
+def test_same_response(asgi_get, client, url):
+    # Primero ASGI (lee de la base de datos) y luego Flask (sale de la caché compartida)
+    assert_same(asgi_get(url), flask_get(client, url))
+
+
+@pytest.mark.parametrize("url", ["/people?limit=5", "/people?sort=-height&limit=4"])
+def test_same_next_page(asgi_get, client, url):
+    next_cursor = json.loads(flask_get(client, url)[2])["next"]
+    assert next_cursor
+    page = f"{url}&after={next_cursor}"
+    assert_same(asgi_get(page), flask_get(client, page))
+
+
+def test_ids_all_missing(asgi_get, client):
+    # ?ids= con ningún id existente es un 200 que dice cuáles faltan, no un 404
+    response = asgi_get("/people?ids=998,999")
+    assert response[0] == 200
+    assert json.loads(response[2]) == {"results": [], "count": 0, "missing": [998, 999]}
+    assert_same(response, flask_get(client, "/people?ids=998,999"))
+
+
+def test_same_not_modified(asgi_get, client):
+    etag = flask_get(client, "/people/1")[1]["etag"]
+    asgi_response = asgi_get("/people/1", [("If-None-Match", etag)])
+    assert asgi_response[0] == 304
+    assert_same(asgi_response, flask_get(client, "/people/1", [("If-None-Match", etag)]))
+
+
+def test_no_validators_without_shared_backend(asgi_get, client, monkeypatch):
+    # Con un backend por proceso (memory) no hay ETag ni 304: otro worker pudo escribir
+    from app import catalogue_cache
+    etag = flask_get(client, "/people/1")[1]["etag"]
+    monkeypatch.setattr(catalogue_cache.backend, "shared", False)
+    for response in (asgi_get("/people/1", [("If-None-Match", etag)]),
+                     flask_get(client, "/people/1", [("If-None-Match", etag)])):
+        assert response[0] == 200
+        assert "etag" not in response[1] and "last-modified" not in response[1]
+        assert response[1]["cache-control"] == "no-cache"
+
+
+@pytest.mark.parametrize("url, compressed", [("/people/1", False), ("/planets?all=true", True)])
+def test_encoding_suffix_only_when_compressed(asgi_get, client, url, compressed):
+    # Un cuerpo menor que COMPRESS_MIN_SIZE va sin comprimir y con el ETag base
+    gzip = [("Accept-Encoding", "gzip")]
+    plain_etag = flask_get(client, url)[1]["etag"]
+    for status, headers, _ in (asgi_get(url, gzip), flask_get(client, url, gzip)):
+        assert status == 200
+        assert (headers.get("content-encoding") == "gzip") is compressed
+        assert (headers["etag"] != plain_etag) is compressed
+        assert headers["etag"].endswith('-gzip"') is compressed
+        assert asgi_get(url, gzip + [("If-None-Match", headers["etag"])])[0] == 304
+        assert flask_get(client, url, gzip + [("If-None-Match", headers["etag"])])[0] == 304
+
+
+def test_same_after_write(asgi_get, client):
+    # Un cambio por Flask invalida la caché que usan las dos rutas
+    before = asgi_get("/people/2")
+    from app import db
+    from models import People
+    with client.application.app_context():
+        db.session.get(People, 2).name = "Renamed"
+        db.session.commit()
+    after = asgi_get("/people/2")
+    assert json.loads(after[2])["name"] == "Renamed"
+    assert after[1]["etag"] != before[1]["etag"]
+    assert_same(after, flask_get(client, "/people/2"))
+
+
+def test_shared_cache_runs_off_the_event_loop(asgi_get):
+    import threading
+    import asgi
+
+    # Con el backend file cada operación de caché de las rutas nativas va a otro hilo
+    assert isinstance(asgi.read_cache.backend, asgi.OffloopBackend)
+    loop_thread = threading.get_ident()
+    threads = set()
+    original = asgi.catalogue_cache.backend.get_counter
+
+    def record(name):
+        threads.add(threading.get_ident())
+        return original(name)
+
+    asgi.catalogue_cache.backend.get_counter = record
+    try:
+        assert asgi_get("/people?limit=2")[0] == 200
+    finally:
+        del asgi.catalogue_cache.backend.get_counter
+    assert threads and loop_thread not in threads
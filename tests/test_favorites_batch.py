@@ -0,0 +1,42 @@
+"""The batch favorite endpoints, with and without RETURNING (MySQL has neither)."""
+import pytest
+
+
+@pytest.fixture(params=[True, False], ids=["returning", "no-returning"])
+def returning(request, app, monkeypatch):
+    from app import db
+
+    with app.app_context():
+        dialect = db.engine.dialect
+    monkeypatch.setattr(dialect, "insert_returning", request.param)
+    monkeypatch.setattr(dialect, "delete_returning", request.param)
+    return request.param
+
+
+def favorite_count(app, model_name, entity_id):
+    from app import db
+    from models import FAVORITE_MODELS
+
+    with app.app_context():
+        return db.session.get(FAVORITE_MODELS[model_name], entity_id).favorite_count
+
+
+def test_add_and_delete_batch(app, client, returning):
+    items = [{"type": "planet", "id": 30}, {"type": "vehicle", "id": 29}, {"type": "planet", "id": 30},
+             {"type": "people", "id": 999}, {"type": "starship", "id": 1}]
+    client.delete("/users/5/favorites/batch", json={"items": items})
+    before = favorite_count(app, "planet", 30)
+
+    response = client.post("/users/5/favorites/batch", json={"items": items})
+    assert response.status_code == 200
+    assert [r["status"] for r in response.get_json()["results"]] == ["added", "added", "exists", "not_found", "invalid"]
+    assert favorite_count(app, "planet", 30) == before + 1
+
+    response = client.post("/users/5/favorites/batch", json={"items": items[:2]})
+    assert [r["status"] for r in response.get_json()["results"]] == ["exists", "exists"]
+    assert favorite_count(app, "planet", 30) == before + 1
+
+    response = client.delete("/users/5/favorites/batch", json={"items": items})
+    assert response.status_code == 200
+    assert [r["status"] for r in response.get_json()["results"]] == ["deleted", "deleted", "not_found", "not_found", "invalid"]
+    assert favorite_count(app, "planet", 30) == before